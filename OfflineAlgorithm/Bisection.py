@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""Bisection driver of the Federal Vaccination Agency. Instead of minimising the number of hospitals M in a single CP-SAT run, every
+probe asks whether the patients fit in k hospitals, with a model without objective and a fixed number of hospitals. A feasible probe
+lowers the upper bound to the hospitals its schedule uses, an infeasible probe raises the lower bound to k + 1."""
+from ortools.sat.python import cp_model
+from OfflineCPSAT import FORMULATIONS, addNoOverlap2DModel, addCumulativeModel, readSchedule
+from Bounds import computeBounds
+from Heuristic import greedySchedule
+from FixedWindows import fixedPatients, solveFixed
+from Decomposition import solveDecomposed
+from SolverOptions import SolverOptions, STRATEGIES
+from Symmetry import symmetricClasses, addSymmetryBreaking, symmetricLines
+from Profiling import Profiler
+from Schedule import Schedule, writeSchedule, anytimeReporter, OPTIMAL, FEASIBLE
+from Instance import parseInput
+import argparse
+import sys
+from time import perf_counter
+
+def probe(programInput, formulation, fixed, machines, hint, timeLimit, options):
+    """Solves whether the input fits in machines hospitals, hinted with the [T1, M1, T2, M2] lines of a feasible schedule.
+
+    Returns (status, schedule): the CP-SAT status and the Schedule that was found, None when the probe found none.
+    """
+    model = cp_model.CpModel()
+    solver = cp_model.CpSolver()
+    if formulation == "cumulative":
+        # The capacity is the constant machines, the hospitals are assigned after solving
+        patientVariables = addCumulativeModel(model, programInput, machines, fixed)
+        highestMachineNumber = None
+    else:
+        highestMachineNumber = model.NewIntVar(1, machines, "M")
+        patientVariables = addNoOverlap2DModel(model, programInput, highestMachineNumber, machines, fixed=fixed)
+
+    if options.symmetry:
+        classes = symmetricClasses(programInput, fixed)
+        addSymmetryBreaking(model, programInput, patientVariables, classes, None if formulation == "cumulative" else machines)
+        hint = symmetricLines(hint, classes, formulation != "cumulative")
+
+    # The times of the previous schedule are always hinted, its hospitals only where they exist in this probe
+    for patient, scheduleLine in zip(patientVariables, hint):
+        patient.addHint(model, programInput, scheduleLine, formulation != "cumulative" and max(scheduleLine[1], scheduleLine[3]) <= machines)
+
+    solver.parameters.max_time_in_seconds = timeLimit
+    options.apply(solver)
+    timeVariables = [variable for patient, isFixed in zip(patientVariables, fixed.tolist()) if not isFixed
+                     for variable in (patient.starttimeDose1, patient.starttimeDose2)]
+    machineVariables = [] if formulation == "cumulative" else [variable for patient in patientVariables
+                                                               for variable in (patient.machineDose1, patient.machineDose2)]
+    options.addDecisionStrategy(model, timeVariables, machineVariables)
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return status, None
+    return status, readSchedule(solver, programInput, formulation, patientVariables, highestMachineNumber, status=FEASIBLE)
+
+def solveBisection(programInput, formulation="nooverlap2d", timeLimit=1800, probeTimeLimit=60, descending=False, onSolution=None,
+                   options=None, profiler=None):
+    """Solves the input with a sequence of probes with a fixed number of hospitals, returns the Schedule.
+
+    The probes start from the bounds of Bounds.py and the schedule of the heuristic. By default the next probe is halfway between the
+    lower bound and the best schedule, with descending it is one hospital below the best schedule. Every probe gets at most
+    probeTimeLimit seconds, and all probes together timeLimit seconds. A probe that runs out of time proves nothing, the probes above it
+    are tried next. onSolution is called with the best Schedule every time the proven interval [bound, machines] shrinks.
+    """
+    options = SolverOptions() if options is None else options
+    profiler = Profiler() if profiler is None else profiler
+    deadline = perf_counter() + timeLimit
+    if len(programInput.patients) == 0:
+        return Schedule([], [], [], [], 0)
+    fixed = fixedPatients(programInput)
+    if fixed.all():
+        schedule = solveFixed(programInput, profiler)
+        if onSolution is not None:
+            onSolution(schedule)
+        return schedule
+
+    heuristic, heuristicMachines = greedySchedule(programInput)
+    lowerBound, upperBound = computeBounds(programInput, heuristicMachines)
+    profiler.lap("bounds")
+    best = Schedule.fromLines(heuristic, heuristicMachines, status=FEASIBLE, bound=lowerBound, bounds=(lowerBound, upperBound),
+                              phases=profiler.phases, stats=profiler.model, profile=profiler)
+    hint = heuristic
+    profiler.solution(best.machines, lowerBound)
+    if onSolution is not None:
+        onSolution(best)
+
+    # bound is the proven lower bound, low the lowest number of hospitals that is still worth a probe
+    bound = lowerBound
+    low = lowerBound
+    counts = {"feasible": 0, "infeasible": 0, "unknown": 0}
+    while low < best.machines and deadline - perf_counter() > 0:
+        machines = best.machines - 1 if descending else (low + best.machines - 1) // 2
+        status, schedule = probe(programInput, formulation, fixed, machines, hint, min(probeTimeLimit, deadline - perf_counter()),
+                                 options)
+        if schedule is not None:
+            counts["feasible"] += 1
+            hint = [[T1, M1, T2, M2] for T1, M1, T2, M2 in zip(schedule.T1.tolist(), schedule.M1.tolist(), schedule.T2.tolist(),
+                                                                schedule.M2.tolist())]
+            best = Schedule(schedule.T1, schedule.M1, schedule.T2, schedule.M2, schedule.machines, FEASIBLE, bound, best.bounds,
+                            profiler.phases, profiler.model, profiler)
+            profiler.solution(best.machines, bound)
+        elif status == cp_model.INFEASIBLE:
+            # No schedule fits in machines hospitals, so none fits in fewer either
+            counts["infeasible"] += 1
+            bound = low = machines + 1
+            best.bound = bound
+            profiler.bound(bound)
+        else:
+            counts["unknown"] += 1
+            low = machines + 1
+            continue
+        if onSolution is not None:
+            onSolution(best)
+
+    profiler.search.update({f"{name} probes": count for name, count in counts.items()})
+    if bound >= best.machines:
+        best.status = OPTIMAL
+    profiler.lap("probes")
+    return best
+
+def SolveILP(programInput, formulation="nooverlap2d", decompose=False, timeLimit=1800, onSolution=None, options=None, profiler=None):
+    """Solves the input by bisection with the default probe time limit, with the same arguments as SolveILP of OfflineCPSAT, so that it
+    can be benchmarked and decomposed like the other solvers."""
+    if decompose:
+        schedule = solveDecomposed(programInput, "Bisection", formulation, timeLimit, options=options)
+        if onSolution is not None and schedule.hasSolution():
+            onSolution(schedule)
+        return schedule
+    return solveBisection(programInput, formulation, timeLimit, onSolution=onSolution, options=options, profiler=profiler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--formulation", choices=FORMULATIONS, default="nooverlap2d", help="model of the probes")
+    parser.add_argument("--descending", action="store_true", help="probe one hospital below the best schedule instead of halfway")
+    parser.add_argument("--probe-time-limit", type=float, default=60, help="time limit of the solver per probe in seconds")
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit of all probes together in seconds")
+    parser.add_argument("--anytime", action="store_true", help="report the proven interval on stderr every time it shrinks")
+    parser.add_argument("--incumbent", help="file to write every improving schedule to while solving")
+    parser.add_argument("--workers", type=int, default=None, help="number of search workers, all cores by default")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="automatic", help="variables the search branches on first")
+    parser.add_argument("--symmetry", action="store_true", help="add constraints that remove equivalent schedules from the probes")
+    parser.add_argument("--profile", help="json file to write the time, memory and number of probes to")
+    args = parser.parse_args()
+
+    profiler = Profiler()
+    programInput = parseInput()
+    profiler.lap("parse")
+    options = SolverOptions(args.workers, args.strategy, symmetry=args.symmetry)
+    onSolution = anytimeReporter(args.incumbent) if args.anytime or args.incumbent else None
+    schedule = solveBisection(programInput, args.formulation, args.time_limit, args.probe_time_limit, args.descending, onSolution, options,
+                              profiler)
+    writeSchedule(schedule)
+    profiler.lap("output")
+    print(schedule.summary(), file=sys.stderr)
+    if args.profile:
+        profiler.writeRecord(args.profile)
+        print(profiler.summary(), file=sys.stderr)
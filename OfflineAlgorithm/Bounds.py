@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""Bounding stage for the offline solvers of the Federal Vaccination Agency. Computes a lower and an upper bound on the number of hospitals
+before a model is built, so that the machine variables and the objective do not have to range over 1..len(patients)."""
+import numpy as np
+
+
+def maxOverlap(starts, ends):
+    """Returns the maximum number of half-open intervals [start, end) that overlap in a single timeslot."""
+    nonEmpty = starts < ends
+    starts = np.sort(starts[nonEmpty])
+    ends = np.sort(ends[nonEmpty])
+    if len(starts) == 0:
+        return 0
+    # The overlap is highest on the start of some interval. There, it is the number of intervals that started so far, minus the ones
+    # that already ended. Ends on the same timeslot are not counted, because [a, b) and [b, c) do not overlap.
+    started = np.searchsorted(starts, starts, side="right")
+    ended = np.searchsorted(ends, starts, side="right")
+    return int((started - ended).max())
+
+def mandatoryIntervals(programInput):
+    """Returns (starts, ends) of the parts of the dose intervals that are occupied no matter where in its window the dose is scheduled.
+
+    A dose with processing time p that can start anywhere in [first, last] always occupies [last, first + p), when that is not empty.
+    """
+    starts = np.concatenate([programInput.lastPossible[0], programInput.lastPossible[1]])
+    ends = np.concatenate([programInput.firstPossible[0] + programInput.p1, programInput.firstPossible[1] + programInput.p2])
+    return starts, ends
+
+def computeLowerBound(programInput):
+    """Returns a lower bound on the number of hospitals needed by any feasible schedule."""
+    patients = programInput.patients
+    if len(patients) == 0:
+        return 0
+
+    # Mandatory parts of the intervals are fixed, so their maximum overlap needs that many hospitals
+    lowerBound = max(1, maxOverlap(*mandatoryIntervals(programInput)))
+
+    # All work has to be done between the earliest first dose and the end of the latest second dose
+    horizon = programInput.maxtime[1] + programInput.p2 - programInput.mintime[0]
+    totalWork = len(patients) * (programInput.p1 + programInput.p2)
+    lowerBound = max(lowerBound, -(-totalWork // horizon))
+    return lowerBound
+
+def earliestIntervals(programInput):
+    """Returns (starts, ends) of the dose intervals of the schedule where every patient takes both doses as early as possible."""
+    starts = np.concatenate([programInput.firstPossible[0], programInput.firstPossible[1]])
+    ends = np.concatenate([programInput.firstPossible[0] + programInput.p1, programInput.firstPossible[1] + programInput.p2])
+    return starts, ends
+
+def computeUpperBound(programInput):
+    """Returns an upper bound on the number of hospitals needed by an optimal schedule.
+
+    Scheduling every dose as early as possible is always feasible, and because all doses have a fixed time the
+    hospitals can then be assigned greedily, so the maximum overlap of that schedule is achievable.
+    """
+    patients = programInput.patients
+    if len(patients) == 0:
+        return 0
+    return min(len(patients), maxOverlap(*earliestIntervals(programInput)))
+
+def computeBounds(programInput, knownUpperBound=None):
+    """Returns the tuple (lowerBound, upperBound) on the number of hospitals.
+
+    knownUpperBound can hold the number of hospitals of an already known feasible schedule, such as the one of the heuristic.
+    """
+    lowerBound = computeLowerBound(programInput)
+    upperBound = computeUpperBound(programInput)
+    if knownUpperBound is not None:
+        upperBound = min(upperBound, knownUpperBound)
+    upperBound = max(lowerBound, upperBound)
+    return lowerBound, upperBound
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""Hospital assignment for schedules of the Federal Vaccination Agency where only the dose times are known. Colours the interval graph
+of the doses, which is exact: the number of hospitals used equals the maximum number of doses given at the same time."""
+import heapq
+import numpy as np
+
+
+def colourIntervals(intervals):
+    """Assigns a hospital to every half-open interval [start, end), such that no hospital has overlapping intervals.
+
+    Returns a tuple (hospitals, count), where hospitals holds the 1-based hospital number of every interval in input order.
+    """
+    hospitals = [0] * len(intervals)
+    order = sorted(range(len(intervals)), key=lambda index: intervals[index][0])
+    busy = [] # Heap of (end, hospital) of the intervals that are still running
+    free = [] # Heap of hospitals that are free at the current time
+    count = 0
+    for index in order:
+        start, end = intervals[index]
+        # Release every hospital whose interval has ended, [a, b) and [b, c) do not overlap
+        while busy and busy[0][0] <= start:
+            heapq.heappush(free, heapq.heappop(busy)[1])
+        if free:
+            hospital = heapq.heappop(free)
+        else:
+            count += 1
+            hospital = count
+        hospitals[index] = hospital
+        heapq.heappush(busy, (end, hospital))
+    return hospitals, count
+
+def assignHospitals(programInput, times):
+    """Turns the [T1, T2] dose times of every patient into a schedule of [T1, M1, T2, M2] lines.
+
+    Returns a tuple (schedule, machines).
+    """
+    intervals = []
+    for T1, T2 in times:
+        intervals.append((T1, T1 + programInput.p1))
+        intervals.append((T2, T2 + programInput.p2))
+    hospitals, count = colourIntervals(intervals)
+    schedule = [[T1, hospitals[2 * job], T2, hospitals[2 * job + 1]] for job, (T1, T2) in enumerate(times)]
+    return schedule, count
+
+def colourIntervalArrays(starts, ends):
+    """Same as colourIntervals for intervals given as arrays of starts and ends, for inputs with millions of doses.
+
+    The start and end events are sorted by numpy, ends before starts on the same timeslot, and a hospital that becomes free is reused
+    by the next start. Any free hospital will do, so a stack is used instead of a heap. Returns a tuple (hospitals, count), where
+    hospitals is an array with the 1-based hospital number of every interval.
+    """
+    numIntervals = len(starts)
+    times = np.concatenate([ends, starts])
+    # Events 0..n-1 are the ends of the intervals, events n..2n-1 their starts
+    events = np.lexsort((np.repeat([0, 1], numIntervals), times))
+    hospitals = [0] * numIntervals
+    free = []
+    count = 0
+    for event in events.tolist():
+        if event < numIntervals:
+            free.append(hospitals[event])
+        elif free:
+            hospitals[event - numIntervals] = free.pop()
+        else:
+            count += 1
+            hospitals[event - numIntervals] = count
+    return np.array(hospitals, dtype=np.int64), count
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+"""Splits an input of the Federal Vaccination Agency into groups of patients whose feasible dose windows never overlap the windows of
+any patient outside the group. These groups are independent: they are solved in parallel and their schedules can share hospitals."""
+import importlib
+import multiprocessing as mp
+import numpy as np
+import os
+from Schedule import Schedule, OPTIMAL, FEASIBLE, INFEASIBLE
+from time import perf_counter
+
+
+def splitComponents(programInput):
+    """Returns the groups of patient indices whose time spans are connected, ordered by time.
+
+    The span of a patient runs from its first possible first dose until the end of its last possible second dose.
+    """
+    starts = programInput.firstPossible[0]
+    ends = programInput.lastPossible[1] + programInput.p2
+    order = np.argsort(starts, kind="stable")
+    if len(order) == 0:
+        return []
+    # A patient that starts after every earlier span has ended can never share a timeslot with them, so it starts a new component
+    reach = np.maximum.accumulate(ends[order])
+    newComponent = starts[order][1:] >= reach[:-1]
+    return np.split(order, np.flatnonzero(newComponent) + 1)
+
+def solveComponent(task):
+    """Solves a single component with the SolveILP function of the given solver module, runs in a worker process."""
+    moduleName, formulation, timeLimit, programInput, solverArguments = task
+    return importlib.import_module(moduleName).SolveILP(programInput, formulation, timeLimit=timeLimit, **solverArguments)
+
+def solveDecomposed(programInput, moduleName, formulation, timeLimit, processes=None, **solverArguments):
+    """Solves every component with the solver module moduleName in a pool of processes, and merges the schedules.
+
+    As the components never share a timeslot, every component can use the hospitals from 1 onwards, the number of hospitals is the
+    maximum over the components. When one of the components has no schedule, neither does the whole input. solverArguments are passed
+    on to SolveILP of the solver module.
+    """
+    components = splitComponents(programInput)
+    if len(components) <= 1:
+        return importlib.import_module(moduleName).SolveILP(programInput, formulation, timeLimit=timeLimit, **solverArguments)
+
+    start = perf_counter()
+    # Hand out the biggest components first, so that one big component does not start last
+    components.sort(key=len, reverse=True)
+    if solverArguments.get("options") is not None:
+        # The components that are solved at the same time share the cores, every solve gets its part of the workers
+        solverArguments["options"] = solverArguments["options"].forComponents(min(len(components), processes or os.cpu_count() or 1))
+    tasks = [(moduleName, formulation, timeLimit, programInput.subset(jobs), solverArguments) for jobs in components]
+    with mp.Pool(processes) as pool:
+        schedules = pool.map(solveComponent, tasks, chunksize=1)
+
+    phases = {"components": perf_counter() - start}
+    missing = [schedule for schedule in schedules if not schedule.hasSolution()]
+    if missing:
+        # An infeasible component makes the whole input infeasible, otherwise the component ran out of time
+        status = INFEASIBLE if any(schedule.status == INFEASIBLE for schedule in missing) else missing[0].status
+        return Schedule.noSolution(status, phases=phases)
+
+    numPatients = len(programInput.patients)
+    T1 = np.zeros(numPatients, dtype=np.int64)
+    M1 = np.zeros(numPatients, dtype=np.int64)
+    T2 = np.zeros(numPatients, dtype=np.int64)
+    M2 = np.zeros(numPatients, dtype=np.int64)
+    for jobs, schedule in zip(components, schedules):
+        T1[jobs] = schedule.T1
+        M1[jobs] = schedule.M1
+        T2[jobs] = schedule.T2
+        M2[jobs] = schedule.M2
+
+    # The components share the hospitals, so the whole schedule needs as many hospitals as the biggest component, and at least as many
+    # as proven for any of them
+    machines = max(schedule.machines for schedule in schedules)
+    bound = max(schedule.bound for schedule in schedules)
+    status = OPTIMAL if all(schedule.status == OPTIMAL for schedule in schedules) else FEASIBLE
+    return Schedule(T1, M1, T2, M2, machines, status, bound, phases=phases)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""Fast path of the offline algorithms of the Federal Vaccination Agency for patients without any choice. A patient with d - r + 1 = p1
+and l = p2 can only take its first dose at r and its second dose at r + p1 + gap + x, so it needs no variables in a model."""
+import numpy as np
+from Colouring import colourIntervalArrays
+from Profiling import Profiler
+from Schedule import Schedule, OPTIMAL
+
+def fixedPatients(programInput):
+    """Returns a boolean array that holds for every patient whether both of its dose times are fixed by its windows."""
+    return (programInput.firstPossible[0] == programInput.lastPossible[0]) & (programInput.firstPossible[1] == programInput.lastPossible[1])
+
+def fixedOccupancy(programInput, fixed, times):
+    """Returns an array with the number of doses of the fixed patients that are in the hospital on each of the timeslots in times."""
+    return occupancy(np.concatenate([programInput.firstPossible[0][fixed], programInput.firstPossible[1][fixed]]),
+                     np.concatenate([programInput.firstPossible[0][fixed] + programInput.p1, programInput.firstPossible[1][fixed] + programInput.p2]),
+                     times)
+
+def occupancy(starts, ends, times):
+    """Returns an array with the number of the doses [start, end) that are in the hospital on each of the timeslots in times."""
+    starts = np.sort(starts)
+    ends = np.sort(ends)
+    # A dose is in the hospital on t when it started on or before t and did not end on or before t, [a, b) does not hold b
+    times = np.asarray(times, dtype=np.int64)
+    return np.searchsorted(starts, times, side="right") - np.searchsorted(ends, times, side="right")
+
+def solveFixed(programInput, profiler=None):
+    """Returns the OPTIMAL Schedule of an input where every patient is fixed, without a solver.
+
+    The doses form an interval graph, and colouring it in order of start time uses exactly as many hospitals as there are doses at the
+    same time at most, which every schedule needs. profiler is the Profiler that measures the colouring.
+    """
+    profiler = Profiler() if profiler is None else profiler
+    T1 = programInput.firstPossible[0]
+    T2 = programInput.firstPossible[1]
+    hospitals, machines = colourIntervalArrays(np.concatenate([T1, T2]), np.concatenate([T1 + programInput.p1, T2 + programInput.p2]))
+    numPatients = len(T1)
+    profiler.lap("fixed")
+    profiler.solution(machines, machines)
+    return Schedule(T1, hospitals[:numPatients], T2, hospitals[numPatients:], machines, OPTIMAL, bounds=(machines, machines),
+                    phases=profiler.phases, profile=profiler)
@@ -3,8 +3,12 @@
 """Input generator for OfflineCPSAT.py and OfflineLS.py, the programs by the Federal Vaccination Agency to schedule vaccinations."""
 import sys
 import os
-import random
+import argparse
+import json
+import numpy as np
 from enum import Enum
+from Bounds import maxOverlap
+from Instance import ProgramInput, writeBinary, writeText
 
 class InputType(Enum):
     Fixed = 0 # Fixed schedule, multiple machines possible
@@ -12,10 +16,105 @@ class InputType(Enum):
     ForceMachineMax = 2 # Fixed schedule, there are not allowed to be more than the provided amount of machines at a given time
     Multiplication = 3 # Semi-fixed schedule, multiple machines possible
 
-
-if __name__ == "__main__":
-
-    PATIENT_GAP_UPPER_BOUND = 10 # Upper bound for patient x range
+PATIENT_GAP_UPPER_BOUND = 10 # Upper bound for patient x range
+CHUNK_SIZE = 4096 # Number of patients of InputType.ForceMachineMax that are checked against the capacity at once
+
+def generate(generatorMode, p1, p2, jobCount, machineMax=None, pMulti=1, seed=None):
+    """Generates an input of the given InputType, returns (ProgramInput, optimum).
+
+    optimum is the number of hospitals of an optimal schedule when it is known, which is the case for the fixed schedules, and None
+    otherwise. The same seed always gives the same input.
+    """
+    rng = np.random.default_rng(seed)
+    gapSize = int(rng.integers(0, 21))
+    pMulti = pMulti if generatorMode is InputType.Multiplication else 1
+    x = rng.integers(0, PATIENT_GAP_UPPER_BOUND + 1, jobCount)
+    l = np.full(jobCount, p2 * pMulti, dtype=np.int64)
+
+    if generatorMode is InputType.Consecutive:
+        # Fixed schedule, one after another: the next patient is released after the second dose of the previous one
+        length = p1 * pMulti + gapSize + x + l
+        r = 1 + (np.cumsum(length) - length).astype(np.int64)
+    elif generatorMode is InputType.ForceMachineMax:
+        r, x = capacityPlacement(rng, p1, p2, gapSize, jobCount, machineMax, x)
+    else:
+        r = rng.integers(1, jobCount + 1, jobCount)
+    d = r + p1 * pMulti - 1
+
+    programInput = ProgramInput(p1, p2, gapSize, r, d, x, l)
+    optimum = None
+    if generatorMode is InputType.Consecutive:
+        optimum = 1 if jobCount > 0 else 0
+    elif generatorMode in (InputType.Fixed, InputType.ForceMachineMax):
+        # Every dose has only one possible time, so the optimum is the maximum number of doses at the same time
+        optimum = maxOverlap(np.concatenate([r, d + gapSize + x + 1]), np.concatenate([r + p1, d + gapSize + x + 1 + p2]))
+    return programInput, optimum
+
+def capacityPlacement(rng, p1, p2, gapSize, jobCount, machineMax, x):
+    """Returns the release times and extra delays of InputType.ForceMachineMax patients.
+
+    Every patient gets a random release time in [1, jobCount], and is kept there when both of its doses fit below machineMax hospitals at
+    every timeslot. A patient that does not fit is placed in a fresh region after all other patients, where it is on its own.
+
+    The patients are checked in chunks against the number of doses per timeslot. Patients of a chunk that fit on their own, but together
+    exceed machineMax, are checked again one by one.
+    """
+    horizon = jobCount + p1 + gapSize + PATIENT_GAP_UPPER_BOUND + p2 + 2
+    totalMachinesAtTime = np.zeros(horizon, dtype=np.int32)
+    offsets1 = np.arange(p1)
+    offsets2 = np.arange(p2)
+    r = rng.integers(1, jobCount + 1, jobCount)
+    placed = np.zeros(jobCount, dtype=bool)
+
+    for chunk in range(0, jobCount, CHUNK_SIZE):
+        jobs = np.arange(chunk, min(chunk + CHUNK_SIZE, jobCount))
+        slots1 = r[jobs, None] + offsets1
+        slots2 = r[jobs, None] + p1 + gapSize + x[jobs, None] + offsets2
+        fits = (totalMachinesAtTime[slots1].max(axis=1) < machineMax) & (totalMachinesAtTime[slots2].max(axis=1) < machineMax)
+        np.add.at(totalMachinesAtTime, slots1[fits], 1)
+        np.add.at(totalMachinesAtTime, slots2[fits], 1)
+
+        # Patients that touch a timeslot above the maximum are taken out again, and retried one by one
+        over = fits & ((totalMachinesAtTime[slots1] > machineMax).any(axis=1) | (totalMachinesAtTime[slots2] > machineMax).any(axis=1))
+        np.subtract.at(totalMachinesAtTime, slots1[over], 1)
+        np.subtract.at(totalMachinesAtTime, slots2[over], 1)
+        placed[jobs[fits & ~over]] = True
+        for index in np.flatnonzero(over).tolist():
+            if totalMachinesAtTime[slots1[index]].max() < machineMax and totalMachinesAtTime[slots2[index]].max() < machineMax:
+                totalMachinesAtTime[slots1[index]] += 1
+                totalMachinesAtTime[slots2[index]] += 1
+                placed[jobs[index]] = True
+
+    # The patients that did not fit follow each other after the horizon, the next one is released after the second dose of the previous
+    unplaced = np.flatnonzero(~placed)
+    length = p1 + gapSize + x[unplaced] + p2
+    r[unplaced] = horizon + (np.cumsum(length) - length).astype(np.int64)
+    return r, x
+
+def writeInstance(path, programInput):
+    """Writes the ProgramInput to path, in the binary format of Instance.py when path ends with .bin and as text otherwise."""
+    if path.endswith(".bin"):
+        writeBinary(path, programInput)
+    else:
+        writeText(path, programInput)
+
+def generateBatch(directory, count, generatorMode, p1, p2, jobCount, machineMax=None, pMulti=1, seed=0, prefix="generated", binary=False):
+    """Writes count inputs to directory, with the seeds seed, seed + 1, ..., and a manifest.json that describes them. Returns the manifest.
+    With binary, the inputs are written in the binary format of Instance.py."""
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for index in range(count):
+        programInput, optimum = generate(generatorMode, p1, p2, jobCount, machineMax, pMulti, seed + index)
+        file = f"{prefix}-{index}.{'bin' if binary else 'txt'}"
+        writeInstance(os.path.join(directory, file), programInput)
+        manifest.append({"file": file, "type": generatorMode.name, "p1": p1, "p2": p2, "gap": programInput.gap, "jobs": jobCount,
+                         "machineMax": machineMax, "pMulti": pMulti, "seed": seed + index, "optimum": optimum})
+    with open(os.path.join(directory, "manifest.json"), "w") as fd:
+        json.dump(manifest, fd, indent=1)
+    return manifest
+
+def askInteractive():
+    """Asks the settings of a single input, returns (generatorMode, p1, p2, jobCount, machineMax, pMulti)."""
     print("Type of input? Any[0] | Consecutive [1] | Maximum amount of machines [2] | Less flexible feasible intervals [3]")
     generationType = int(input())
     generatorMode = InputType(generationType)
@@ -26,6 +125,7 @@ if __name__ == "__main__":
     print("Total jobs?")
     jobCount = int(input())
 
+    machineMax = None
     if generatorMode is InputType.ForceMachineMax:
         print("Max machines?")
         machineMax = int(input())
@@ -35,82 +135,37 @@ if __name__ == "__main__":
         pMulti = int(input())
     else:
         pMulti = 1
+    return generatorMode, p1, p2, jobCount, machineMax, pMulti
 
-    fd = open("input.txt", "w")
-
-    gapSize = random.randint(0, 20)
-
-    # Store all basic information in array
-    lines = []
-    lines.append(str(p1))
-    lines.append(str(p2))
-    lines.append(str(gapSize))
-    lines.append(str(jobCount))
-
-    next_r = 1 # r that the next iteration of InputType.Consecutive should use
-
-    # Array to store how many machines are used currently. Used by InputType.ForceMachineMax
-    totalPossibleTime = jobCount * ((p1 + p2) * pMulti + gapSize + PATIENT_GAP_UPPER_BOUND)
-    totalMachinesAtTime = [0] * totalPossibleTime
-
-    for i in range(0, jobCount):
-        r = -1
-        d = -1
-        x = -1
-        l = -1
-
-        if generatorMode == InputType.Fixed or generatorMode == InputType.ForceMachineMax or generatorMode == InputType.Multiplication:
-            # Fixed schedule, multiple machines possible
-            r = random.randint(1, jobCount)
-            d = r + p1 * pMulti - 1
-            x = random.randint(0, PATIENT_GAP_UPPER_BOUND)
-            l = p2 * pMulti
-
-        if generatorMode == InputType.ForceMachineMax:
-            # Check if the generated r,d,x,l fall within specification (i.e. don"t exceed set maximum machine count)
-            mayPlace = False
-            while not mayPlace:
-                mayPlace = True
-                for slot in range(r, d+1):
-                    if totalMachinesAtTime[slot] >= machineMax:
-                        mayPlace = False
-                for slot in range(d + gapSize + x + 1, d + gapSize + x + 1 + l):
-                    if totalMachinesAtTime[slot] >= machineMax:
-                        mayPlace = False
-                if mayPlace:
-                    for slot in range(r, d+1):
-                        totalMachinesAtTime[slot] += 1
-                    for slot in range(d + gapSize + x + 1, d + gapSize + x + 1 + l):
-                        totalMachinesAtTime[slot] += 1
-                else: 
-                    r = totalPossibleTime
-                    d = r + p1 * pMulti - 1
-                    x = random.randint(0, PATIENT_GAP_UPPER_BOUND)
-                    l = p2 * pMulti
-                    oldPossible = totalPossibleTime
-                    totalPossibleTime += p1 * pMulti + p2 * pMulti + x + gapSize
-                    for slot in range(oldPossible, totalPossibleTime):
-                        totalMachinesAtTime.append(0)
-
-        if generatorMode == InputType.Consecutive:
-            # Fixed schedule, one after another
-            r = next_r
-            d = r + p1 * pMulti - 1
-            x = random.randint(0, PATIENT_GAP_UPPER_BOUND)
-            l = p2 * pMulti
-            next_r = d + x + gapSize + 1 + l
-
-        lines.append(f"{r}, {d}, {x}, {l}")
-
-    # Add newline character to all strings
-    for i in range(0, len(lines)):
-        lines[i] += "\n"
-    
-    fd.writelines(lines)
-
-    # Count how many machines were made, output this as it should be the optimum
-    if generatorMode == InputType.ForceMachineMax:
-        machines = 0
-        for i in range(0, len(totalMachinesAtTime)):
-            machines = max(machines, totalMachinesAtTime[i])
-        print(f"Optimum should have {machines} machines")
\ No newline at end of file
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        # Without arguments, ask for the settings and write a single input.txt
+        generatorMode, p1, p2, jobCount, machineMax, pMulti = askInteractive()
+        programInput, optimum = generate(generatorMode, p1, p2, jobCount, machineMax, pMulti)
+        writeInstance("input.txt", programInput)
+        if optimum is not None:
+            print(f"Optimum should have {optimum} machines")
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--type", type=int, choices=[inputType.value for inputType in InputType], required=True,
+                        help="Any [0] | Consecutive [1] | Maximum amount of machines [2] | Less flexible feasible intervals [3]")
+    parser.add_argument("--p1", type=int, required=True, help="processing time of the first dose")
+    parser.add_argument("--p2", type=int, required=True, help="processing time of the second dose")
+    parser.add_argument("--jobs", type=int, required=True, help="number of patients")
+    parser.add_argument("--max-machines", type=int, help="maximum number of machines, for type 2")
+    parser.add_argument("--multiplier", type=int, default=1, help="multiplier of the feasible intervals, for type 3")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first input, the next inputs use the following seeds")
+    parser.add_argument("--count", type=int, default=1, help="number of inputs to generate")
+    parser.add_argument("--output", default=".", help="directory to write the inputs and their manifest.json to")
+    parser.add_argument("--prefix", default="generated", help="start of the file names of the inputs")
+    parser.add_argument("--binary", action="store_true", help="write the inputs in the binary format, as .bin files")
+    args = parser.parse_args()
+
+    generatorMode = InputType(args.type)
+    if generatorMode is InputType.ForceMachineMax and args.max_machines is None:
+        parser.error("--max-machines is required for type 2")
+    manifest = generateBatch(args.output, args.count, generatorMode, args.p1, args.p2, args.jobs, args.max_machines, args.multiplier,
+                             args.seed, args.prefix, args.binary)
+    for entry in manifest:
+        print(f"{entry['file']}: optimum {entry['optimum']}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""Greedy list-scheduler for the offline problem of the Federal Vaccination Agency. Finds a feasible schedule in milliseconds, which is
+used as a warm start for the exact solvers, or on its own for instances that are too big to solve exactly."""
+from bisect import bisect_right
+
+
+class Hospital:
+    """Timeline of a single hospital, kept as a sorted list of booked half-open intervals [start, end)."""
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def earliestFree(self, earliest, latest, length):
+        """Returns the earliest start in [earliest, latest] at which the hospital is free for length timeslots, or None."""
+        time = earliest
+        # Find the last booking that starts at or before time, and move past it when it is still running
+        index = bisect_right(self.starts, time) - 1
+        if index >= 0 and self.ends[index] > time:
+            time = self.ends[index]
+        # Move past every following booking that starts before the dose would be done
+        index += 1
+        while index < len(self.starts) and self.starts[index] < time + length:
+            time = max(time, self.ends[index])
+            index += 1
+        if time > latest:
+            return None
+        return time
+
+    def book(self, start, end):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+
+
+def firstFit(hospitals, earliest, latest, length):
+    """Returns (start, hospital index) of the earliest start in [earliest, latest] on any hospital, preferring the lowest hospital index on ties."""
+    best = None
+    for index, hospital in enumerate(hospitals):
+        start = hospital.earliestFree(earliest, latest, length)
+        if start is not None and (best is None or start < best[0]):
+            best = (start, index)
+    return best
+
+def greedySchedule(programInput, hospitals=None):
+    """Schedules the patients in earliest-deadline order, placing every dose on the first hospital that can take it as early as possible.
+
+    hospitals can hold Hospital timelines that already have bookings, the patients are scheduled around them and new hospitals are
+    added after them. Returns a tuple (schedule, machines), where schedule holds [T1, M1, T2, M2] for every patient in input order.
+    """
+    p1 = programInput.p1
+    p2 = programInput.p2
+    patients = list(programInput.patients)
+    hospitals = [] if hospitals is None else hospitals
+    schedule = [None] * len(patients)
+
+    # Earliest-deadline order: patients whose first dose has to be taken soonest are scheduled first
+    order = sorted(range(len(patients)), key=lambda job: (patients[job].lastPossible[0], patients[job].r))
+    for job in order:
+        patient = patients[job]
+        shift = p1 + programInput.gap + patient.x
+
+        # Candidate times for the first dose are the earliest free times on every hospital, we try them from early to late
+        candidates = set()
+        for hospital in hospitals:
+            start = hospital.earliestFree(patient.firstPossible[0], patient.lastPossible[0], p1)
+            if start is not None:
+                candidates.add(start)
+
+        placement = None
+        for T1 in sorted(candidates):
+            dose1 = firstFit(hospitals, T1, T1, p1)
+            dose2 = firstFit(hospitals, T1 + shift, T1 + shift + patient.l - p2, p2)
+            if dose2 is not None:
+                placement = (T1, dose1[1], dose2[0], dose2[1])
+                break
+
+        if placement is None and candidates:
+            # The first dose fits in an existing hospital, but the second does not: open a new hospital for the second dose
+            T1 = min(candidates)
+            dose1 = firstFit(hospitals, T1, T1, p1)
+            hospitals.append(Hospital())
+            placement = (T1, dose1[1], T1 + shift, len(hospitals) - 1)
+
+        if placement is None:
+            # Neither dose fits, both doses go as early as possible in a new hospital
+            hospitals.append(Hospital())
+            T1 = patient.firstPossible[0]
+            placement = (T1, len(hospitals) - 1, T1 + shift, len(hospitals) - 1)
+
+        T1, M1, T2, M2 = placement
+        hospitals[M1].book(T1, T1 + p1)
+        hospitals[M2].book(T2, T2 + p2)
+        schedule[job] = [T1, M1 + 1, T2, M2 + 1]
+
+    return schedule, len(hospitals)
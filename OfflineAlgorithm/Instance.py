@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""Input of the offline algorithms of the Federal Vaccination Agency. The input is read in one go and kept as columns of arrays, patients
+are only turned into objects when they are accessed.
+
+Besides the text format, an input can be stored in a binary format: the 8 bytes of BINARY_MAGIC, p1, p2, gap and the number of patients
+n, followed by the columns r, d, x and l of n values each, all as little-endian 32-bit integers. A binary file is memory-mapped instead
+of parsed, and its columns are widened to 64 bits in a single copy, as the windows and the ends of the doses can exceed 32 bits."""
+import argparse
+import os
+import sys
+import numpy as np
+
+BINARY_MAGIC = b"FVAINST1"
+BINARY_TYPE = np.dtype("<i4")
+# The header is the magic followed by p1, p2, gap and n
+HEADER_SIZE = len(BINARY_MAGIC) + 4 * BINARY_TYPE.itemsize
+
+class Patient:
+    __slots__ = ("r", "d", "x", "l", "firstPossible", "lastPossible")
+
+    def __init__(self, r, d, x, l, p1, p2, gap):
+        self.r = r
+        self.d = d
+        self.x = x
+        self.l = l
+        self.firstPossible = [r, r + p1 + gap + x] #First possible time for first dose, first possible time for second dose (if first dose was taken at r)
+        self.lastPossible = [d - p1 + 1, d + gap + x + l - p2 + 1] #Last possible time for first dose, last possible time for second dose (if first dose processing ended at d)
+
+class Patients:
+    """Sequence of Patient views on the columns of a ProgramInput, a Patient is only created when it is accessed"""
+    def __init__(self, programInput):
+        self.programInput = programInput
+
+    def __len__(self):
+        return len(self.programInput.r)
+
+    def __getitem__(self, index):
+        programInput = self.programInput
+        if isinstance(index, slice):
+            return [self[job] for job in range(*index.indices(len(self)))]
+        return Patient(int(programInput.r[index]), int(programInput.d[index]), int(programInput.x[index]), int(programInput.l[index]),
+                       programInput.p1, programInput.p2, programInput.gap)
+
+    def __iter__(self):
+        programInput = self.programInput
+        # Converting the columns to lists at once is a lot faster than reading the arrays element by element
+        for r, d, x, l in zip(programInput.r.tolist(), programInput.d.tolist(), programInput.x.tolist(), programInput.l.tolist()):
+            yield Patient(r, d, x, l, programInput.p1, programInput.p2, programInput.gap)
+
+class ProgramInput:
+    """All info read from input
+
+    Attributes:
+        p1                  Processing time for first dose
+        p2                  Processing time for second dose
+        gap                 Patient-independent delay between first and second dose
+        r, d, x, l          Arrays with the release time, deadline, extra delay and interval length of all patients
+        firstPossible[0/1]  Arrays with the first possible time of the first resp. second dose of all patients
+        lastPossible[0/1]   Arrays with the last possible time of the first resp. second dose of all patients
+        patients            Information of all patients, as Patient views on the arrays
+        mintime[0/1]        Lowest possible time seen for first resp. second dose of any patient
+        maxtime[0/1]        Highest possible time seen for first resp. second dose of any patient
+    """
+    def __init__(self, p1, p2, gap, r, d, x, l):
+        self.p1 = p1
+        self.p2 = p2
+        self.gap = gap
+        self.r = r
+        self.d = d
+        self.x = x
+        self.l = l
+        self.firstPossible = np.array([r, r + p1 + gap + x])
+        self.lastPossible = np.array([d - p1 + 1, d + gap + x + l - p2 + 1])
+        self.patients = Patients(self)
+        if len(r) == 0:
+            self.mintime = [float("inf")] * 2
+            self.maxtime = [0] * 2
+        else:
+            self.mintime = [int(self.firstPossible[0].min()), int(self.firstPossible[1].min())]
+            self.maxtime = [int(self.lastPossible[0].max()), int(self.lastPossible[1].max())]
+
+    def subset(self, jobs):
+        """Returns the ProgramInput that only holds the patients with the given indices."""
+        jobs = np.asarray(jobs, dtype=np.int64)
+        return ProgramInput(self.p1, self.p2, self.gap, self.r[jobs], self.d[jobs], self.x[jobs], self.l[jobs])
+
+def parseValues(text):
+    """Turns the comma and newline seperated input into a flat array of all numbers."""
+    text = text.replace(",", " ")
+    values = np.fromstring(text, dtype=np.int64, sep=" ")
+    # Numbers that do not fit in 64 bits are clipped by numpy, those inputs are parsed as Python integers instead
+    if len(values) > 0 and (values.max() == np.iinfo(np.int64).max or values.min() == np.iinfo(np.int64).min):
+        values = np.array([int(value) for value in text.split()], dtype=object)
+    return values
+
+def parseText(text):
+    """Turns the text of an input file into a ProgramInput object"""
+    values = parseValues(text)
+    p1, p2, gap, numPatients = (int(value) for value in values[:4])
+    columns = values[4:4 + 4 * numPatients].reshape(numPatients, 4)
+    # Copy the columns, so that every column is a contiguous array
+    r, d, x, l = (np.ascontiguousarray(columns[:, column]) for column in range(4))
+    return ProgramInput(p1, p2, gap, r, d, x, l)
+
+def parseBinary(data):
+    """Turns the bytes of a binary input into a ProgramInput object"""
+    p1, p2, gap, numPatients = (int(value) for value in np.frombuffer(data, BINARY_TYPE, 4, len(BINARY_MAGIC)))
+    columns = np.frombuffer(data, BINARY_TYPE, 4 * numPatients, HEADER_SIZE).reshape(4, numPatients).astype(np.int64)
+    return ProgramInput(p1, p2, gap, *columns)
+
+def parseInput():
+    """Turns the input into a ProgramInput object, the input is either text or binary"""
+    data = sys.stdin.buffer.read()
+    if data.startswith(BINARY_MAGIC):
+        return parseBinary(data)
+    return parseText(data.decode())
+
+def loadBinary(path):
+    """Memory-maps the binary input file at path into a ProgramInput object"""
+    with open(path, "rb") as fd:
+        header = fd.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(BINARY_MAGIC):
+        raise ValueError(f"{path} is not a binary input")
+    p1, p2, gap, numPatients = (int(value) for value in np.frombuffer(header, BINARY_TYPE, 4, len(BINARY_MAGIC)))
+    if numPatients == 0:
+        # An empty map is not allowed
+        columns = np.zeros((4, 0), dtype=BINARY_TYPE)
+    else:
+        columns = np.memmap(path, BINARY_TYPE, "r", HEADER_SIZE, (4, numPatients))
+    # The solvers compute windows and ends of doses such as lastPossible[1] + p2 in the type of the columns, which would wrap in 32 bits
+    return ProgramInput(p1, p2, gap, *np.asarray(columns, dtype=np.int64))
+
+def loadInstance(path):
+    """Reads the input file at path into a ProgramInput object, a binary input file is memory-mapped"""
+    with open(path, "rb") as fd:
+        if fd.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            return loadBinary(path)
+        fd.seek(0)
+        return parseText(fd.read().decode())
+
+def formatInstance(programInput):
+    """Returns the text of the input file of the ProgramInput."""
+    lines = [f"{programInput.p1}\n{programInput.p2}\n{programInput.gap}\n{len(programInput.r)}\n"]
+    columns = (programInput.r.tolist(), programInput.d.tolist(), programInput.x.tolist(), programInput.l.tolist())
+    lines.extend(f"{r}, {d}, {x}, {l}\n" for r, d, x, l in zip(*columns))
+    return "".join(lines)
+
+def writeBinary(path, programInput):
+    """Writes the ProgramInput to path in the binary format. Raises ValueError when a number of the input does not fit in 32 bits."""
+    limits = np.iinfo(BINARY_TYPE)
+    values = [programInput.p1, programInput.p2, programInput.gap]
+    if len(programInput.r) > 0:
+        values.extend(int(function(column)) for column in (programInput.r, programInput.d, programInput.x, programInput.l)
+                      for function in (np.min, np.max))
+    if any(value < limits.min or value > limits.max for value in values):
+        raise ValueError("the input does not fit in the binary format, its numbers have to fit in 32 bits")
+    header = np.array([programInput.p1, programInput.p2, programInput.gap, len(programInput.r)], dtype=BINARY_TYPE)
+    columns = np.stack([programInput.r, programInput.d, programInput.x, programInput.l]).astype(BINARY_TYPE)
+    # Write to a temporary file first, so that a process that maps the file never sees half an input
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as fd:
+        fd.write(BINARY_MAGIC)
+        fd.write(header.tobytes())
+        fd.write(columns.tobytes())
+    os.replace(temporary, path)
+
+def writeText(path, programInput):
+    with open(path, "w") as fd:
+        fd.write(formatInstance(programInput))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts an input file between the text and the binary format.")
+    parser.add_argument("input", help="input file, text or binary")
+    parser.add_argument("output", help="file to write the input to")
+    parser.add_argument("--format", choices=["binary", "text"], default=None, help="format of the output, the other format than the input by default")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as fd:
+        binary = fd.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    programInput = loadInstance(args.input)
+    if (args.format or ("text" if binary else "binary")) == "binary":
+        writeBinary(args.output, programInput)
+    else:
+        writeText(args.output, programInput)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+"""Large neighbourhood search of the Federal Vaccination Agency, for inputs that the CP-SAT model can not solve to optimality in time.
+Starting from a feasible schedule, the patients on the highest hospital and a neighbourhood around them are freed, everyone else keeps
+their doses, and a short CP-SAT run moves as much of the freed load as it can off the highest hospital. Once that hospital is empty,
+the schedule needs one hospital less."""
+from ortools.sat.python import cp_model
+from OfflineCPSAT import addNoOverlap2DModel
+from Bounds import computeBounds
+from Heuristic import greedySchedule
+from FixedWindows import fixedPatients, solveFixed
+from Decomposition import solveDecomposed
+from SolverOptions import SolverOptions
+from Profiling import Profiler
+from Schedule import Schedule, writeSchedule, anytimeReporter, OPTIMAL, FEASIBLE
+from Instance import parseInput
+import argparse
+import multiprocessing as mp
+import numpy as np
+import os
+import sys
+from time import perf_counter
+
+# The kinds of neighbourhood: the patients with a dose in a time window around a dose on the highest hospital, or the patients with a
+# dose on some other hospitals. Both always hold the patients on the highest hospital.
+NEIGHBOURHOODS = ["window", "hospitals"]
+# Size of a neighbourhood of every kind at the start, in timeslots for "window" and in hospitals for "hospitals"
+INITIAL_SIZES = {"window": 20, "hospitals": 2}
+# Weight of the last sub-solve in the score of its kind of neighbourhood
+SCORE_DECAY = 0.3
+
+def topLoad(schedule, p1, p2, machines):
+    """Returns the number of timeslots that the doses on hospital machines take."""
+    return p1 * int(np.count_nonzero(schedule[1] == machines)) + p2 * int(np.count_nonzero(schedule[3] == machines))
+
+def freeNeighbourhood(kind, size, schedule, machines, programInput, rng):
+    """Returns the boolean mask of the patients of a random neighbourhood of the given kind and size. schedule holds the T1, M1, T2 and M2
+    arrays, machines is its highest hospital."""
+    T1, M1, T2, M2 = schedule
+    free = (M1 == machines) | (M2 == machines)
+    if kind == "window":
+        job = int(rng.choice(np.flatnonzero(free)))
+        middle = int(T1[job]) if M1[job] == machines else int(T2[job])
+        start = middle - size // 2
+        end = start + size
+        free |= ((T1 < end) & (T1 + programInput.p1 > start)) | ((T2 < end) & (T2 + programInput.p2 > start))
+    else:
+        others = rng.permutation(np.arange(1, machines))[:size]
+        free |= np.isin(M1, others) | np.isin(M2, others)
+    return free
+
+def solveNeighbourhood(task):
+    """Reschedules the freed patients around the doses of all other patients, minimising the load on hospital machines. Runs in a
+    worker process.
+
+    Returns (status, lines, load): the CP-SAT status, the [T1, M1, T2, M2] lines of the freed patients and their load on hospital
+    machines, lines is None when the sub-solve found nothing.
+    """
+    programInput, fixedDoses, machines, hint, timeLimit, options = task
+    model = cp_model.CpModel()
+    solver = cp_model.CpSolver()
+    highestMachineNumber = model.NewIntVar(1, machines, "M")
+    patientVariables = addNoOverlap2DModel(model, programInput, highestMachineNumber, machines, fixedDoses, fixedPatients(programInput))
+    for patient, scheduleLine in zip(patientVariables, hint):
+        patient.addHint(model, programInput, scheduleLine, True)
+
+    # The load of a dose on the highest hospital is its processing time, a dose on any other hospital has none
+    load = []
+    for patient in patientVariables:
+        for machine, length in ((patient.machineDose1, programInput.p1), (patient.machineDose2, programInput.p2)):
+            onTop = model.NewBoolVar("onTop")
+            model.Add(machine == machines).OnlyEnforceIf(onTop)
+            model.Add(machine < machines).OnlyEnforceIf(onTop.Not())
+            load.append(length * onTop)
+    model.Minimize(sum(load))
+
+    solver.parameters.max_time_in_seconds = timeLimit
+    options.apply(solver)
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return status, None, None
+    return status, [patient.solutionLine(solver) for patient in patientVariables], int(solver.ObjectiveValue())
+
+def compactHospitals(M1, M2):
+    """Renumbers the hospitals that are used to 1, 2, ... in order, returns (M1, M2, machines)."""
+    used, inverse = np.unique(np.concatenate([M1, M2]), return_inverse=True)
+    inverse = inverse.reshape(-1) + 1
+    return inverse[:len(M1)], inverse[len(M1):], len(used)
+
+def solveLNS(programInput, start=None, timeLimit=1800, subTimeLimit=10, processes=None, seed=0, onSolution=None, options=None,
+             profiler=None):
+    """Improves a feasible schedule by large neighbourhood search, returns the best Schedule.
+
+    start is the feasible Schedule to start from, the schedule of the heuristic by default. Every round, processes sub-solves of at
+    most subTimeLimit seconds run in parallel on their own neighbourhood, and the one that leaves the least load on the highest hospital
+    is kept when it does not leave more load than before. The kind of every neighbourhood is drawn by the score of the kinds, the share
+    of their sub-solves that reduced the load lately. A kind grows when its sub-solve proved that it can not do better, and shrinks when
+    its sub-solve ran out of time. The search stops after timeLimit seconds, or when the schedule meets the lower bound. onSolution is
+    called with every Schedule that needs fewer hospitals.
+    """
+    options = SolverOptions() if options is None else options
+    profiler = Profiler() if profiler is None else profiler
+    processes = processes or os.cpu_count() or 1
+    deadline = perf_counter() + timeLimit
+    if len(programInput.patients) == 0:
+        return Schedule([], [], [], [], 0)
+    if fixedPatients(programInput).all():
+        schedule = solveFixed(programInput, profiler)
+        if onSolution is not None:
+            onSolution(schedule)
+        return schedule
+
+    if start is None:
+        heuristic, heuristicMachines = greedySchedule(programInput)
+        start = Schedule.fromLines(heuristic, heuristicMachines, status=FEASIBLE)
+    lowerBound, upperBound = computeBounds(programInput, start.machines)
+    M1, M2, machines = compactHospitals(start.M1, start.M2)
+    schedule = [start.T1.copy(), M1, start.T2.copy(), M2]
+    profiler.lap("bounds")
+    profiler.solution(machines, lowerBound)
+
+    def result(status):
+        return Schedule(*schedule, machines, status, lowerBound, (lowerBound, upperBound), profiler.phases, profiler.model, profiler)
+    if onSolution is not None:
+        onSolution(result(FEASIBLE))
+
+    rng = np.random.default_rng(seed)
+    p1 = programInput.p1
+    p2 = programInput.p2
+    sizes = dict(INITIAL_SIZES)
+    scores = {kind: 1.0 for kind in NEIGHBOURHOODS}
+    counts = {"rounds": 0, "sub-solves": 0, "improving": 0}
+    subOptions = options.forComponents(processes)
+    pool = mp.Pool(processes) if processes > 1 else None
+    try:
+        while machines > lowerBound and deadline - perf_counter() > 0:
+            load = topLoad(schedule, p1, p2, machines)
+            weights = np.array([scores[kind] for kind in NEIGHBOURHOODS]) + 0.05
+            kinds = rng.choice(NEIGHBOURHOODS, size=processes, p=weights / weights.sum()).tolist()
+            freed = [freeNeighbourhood(kind, sizes[kind], schedule, machines, programInput, rng) for kind in kinds]
+            limit = min(subTimeLimit, deadline - perf_counter())
+            tasks = [neighbourhoodTask(programInput, schedule, free, machines, limit, subOptions) for free in freed]
+            results = pool.map(solveNeighbourhood, tasks, chunksize=1) if pool is not None else [solveNeighbourhood(task) for task in tasks]
+            counts["rounds"] += 1
+            counts["sub-solves"] += len(tasks)
+
+            for kind, (status, lines, newLoad) in zip(kinds, results):
+                improved = lines is not None and newLoad < load
+                scores[kind] = (1 - SCORE_DECAY) * scores[kind] + SCORE_DECAY * improved
+                counts["improving"] += improved
+                if status == cp_model.OPTIMAL and not improved:
+                    # The neighbourhood was searched completely without success, a bigger one may succeed
+                    sizes[kind] = int(sizes[kind] * 1.5) + 1
+                elif status != cp_model.OPTIMAL:
+                    sizes[kind] = max(1, int(sizes[kind] * 0.7))
+
+            # Keep the neighbourhood that left the least load on the highest hospital, the others started from the same schedule
+            found = [index for index, (status, lines, newLoad) in enumerate(results) if lines is not None and newLoad <= load]
+            if not found:
+                continue
+            index = min(found, key=lambda index: results[index][2])
+            jobs = np.flatnonzero(freed[index])
+            lines = np.array(results[index][1], dtype=np.int64).reshape(-1, 4)
+            for column in range(4):
+                schedule[column][jobs] = lines[:, column]
+            if results[index][2] == 0:
+                schedule[1], schedule[3], machines = compactHospitals(schedule[1], schedule[3])
+                profiler.solution(machines, lowerBound)
+                if onSolution is not None:
+                    onSolution(result(FEASIBLE))
+    finally:
+        if pool is not None:
+            pool.close()
+
+    profiler.search.update(counts)
+    profiler.search.update({f"{kind} size": size for kind, size in sizes.items()})
+    profiler.lap("search")
+    return result(OPTIMAL if machines <= lowerBound else FEASIBLE)
+
+def neighbourhoodTask(programInput, schedule, free, machines, timeLimit, options):
+    """Returns the task of solveNeighbourhood for the freed patients: their input, the doses of the other patients that are in the
+    hospital during the span of the freed ones, and the current lines of the freed patients as hint."""
+    T1, M1, T2, M2 = schedule
+    jobs = np.flatnonzero(free)
+    subset = programInput.subset(jobs)
+    spanStart = int(subset.firstPossible[0].min())
+    spanEnd = int(subset.lastPossible[1].max()) + programInput.p2
+    kept = np.flatnonzero(~free)
+    fixedDoses = []
+    for starts, hospitals, length in ((T1[kept], M1[kept], programInput.p1), (T2[kept], M2[kept], programInput.p2)):
+        inSpan = (starts < spanEnd) & (starts + length > spanStart)
+        fixedDoses.extend((start, start + length, machine) for start, machine in zip(starts[inSpan].tolist(), hospitals[inSpan].tolist()))
+    hint = np.stack([T1[jobs], M1[jobs], T2[jobs], M2[jobs]], axis=1).tolist()
+    return subset, fixedDoses, machines, hint, timeLimit, options
+
+def SolveILP(programInput, formulation="nooverlap2d", decompose=False, timeLimit=1800, onSolution=None, options=None, profiler=None):
+    """Improves the schedule of the heuristic by large neighbourhood search, with the same arguments as SolveILP of OfflineCPSAT, so
+    that it can be benchmarked and decomposed like the other solvers. The sub-solves run one at a time, with all workers of options."""
+    if decompose:
+        schedule = solveDecomposed(programInput, "LargeNeighbourhood", formulation, timeLimit, options=options)
+        if onSolution is not None and schedule.hasSolution():
+            onSolution(schedule)
+        return schedule
+    return solveLNS(programInput, timeLimit=timeLimit, processes=1, onSolution=onSolution, options=options, profiler=profiler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit of the search in seconds")
+    parser.add_argument("--sub-time-limit", type=float, default=10, help="time limit of the solver per neighbourhood in seconds")
+    parser.add_argument("--processes", type=int, default=None, help="number of neighbourhoods solved in parallel, one per core by default")
+    parser.add_argument("--workers", type=int, default=None, help="number of search workers of all sub-solves together, all cores by default")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the choice of the neighbourhoods")
+    parser.add_argument("--anytime", action="store_true", help="report every improving schedule on stderr while searching")
+    parser.add_argument("--incumbent", help="file to write every improving schedule to while searching")
+    parser.add_argument("--profile", help="json file to write the time, memory and the statistics of the search to")
+    args = parser.parse_args()
+
+    profiler = Profiler()
+    programInput = parseInput()
+    profiler.lap("parse")
+    onSolution = anytimeReporter(args.incumbent) if args.anytime or args.incumbent else None
+    schedule = solveLNS(programInput, None, args.time_limit, args.sub_time_limit, args.processes, args.seed, onSolution,
+                        SolverOptions(args.workers, seed=args.seed), profiler)
+    writeSchedule(schedule)
+    profiler.lap("output")
+    print(schedule.summary(), file=sys.stderr)
+    if args.profile:
+        profiler.writeRecord(args.profile)
+        print(profiler.summary(), file=sys.stderr)
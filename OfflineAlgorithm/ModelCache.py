@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""Disk store of the models built by the offline algorithms of the Federal Vaccination Agency. Building a model in Python takes a large
+part of the run time on big inputs, a stored model is loaded instead of built again on the next run. The stored CP-SAT models and MPS
+files can also be solved by the standalone solver binaries."""
+import json
+import os
+import numpy as np
+from SolutionCache import canonicalize
+
+class ModelCache:
+    """Built models on disk by canonical input and model name, every model is a model file and a JSON sidecar
+
+    The sidecar holds what a solver needs besides the model: the schedule of the heuristic, the bounds, and per patient the indices of
+    the variables to read the schedule from. Its columns are stored in the canonical order of the patients, so inputs that only differ
+    in the order of their patients share their models. The times in the model are not shifted, so the earliest release time is part
+    of the key.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, programInput, name):
+        """Returns (base, order): the path of the files of the model of the input without their extension, and the canonical order."""
+        key, order, offset = canonicalize(programInput)
+        return os.path.join(self.directory, f"{key}-{offset}-{name}"), order
+
+    def load(self, programInput, name, extension):
+        """Returns (modelPath, sidecar) of the stored model of the input, or None when there is no such model.
+
+        The columns of the sidecar are returned in the order of the patients of the input.
+        """
+        base, order = self.path(programInput, name)
+        try:
+            with open(base + ".json", "r") as fd:
+                sidecar = json.load(fd)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(f"{base}.{extension}"):
+            return None
+        columns = {}
+        for column, values in sidecar["columns"].items():
+            columns[column] = np.zeros(len(order), dtype=np.int64)
+            columns[column][order] = values
+        sidecar["columns"] = columns
+        return f"{base}.{extension}", sidecar
+
+    def save(self, programInput, name, files, sidecar):
+        """Stores a model of the input. files maps every extension of a model file to a function write(path) that writes it to path, which
+        ends with the extension. The columns of the sidecar are arrays in the order of the patients of the input. Returns the path of the
+        model files without their extension."""
+        base, order = self.path(programInput, name)
+        sidecar = dict(sidecar)
+        sidecar["columns"] = {column: np.asarray(values)[order].tolist() for column, values in sidecar["columns"].items()}
+        # Write to temporary files first, so that a reader never sees half a model. The sidecar is written last, as it marks the model
+        # as complete.
+        temporary = f"{base}.{os.getpid()}.tmp"
+        for extension, write in files.items():
+            write(f"{temporary}.{extension}")
+            os.replace(f"{temporary}.{extension}", f"{base}.{extension}")
+        with open(f"{temporary}.json", "w") as fd:
+            json.dump(sidecar, fd)
+        os.replace(f"{temporary}.json", f"{base}.json")
+        return base
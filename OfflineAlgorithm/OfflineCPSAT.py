@@ -2,22 +2,34 @@
 
 """Offline algorithm of the Federal Vaccination Agency, to find the best schedule for vaccinating the population of a small country."""
 from ortools.sat.python import cp_model
+from Bounds import computeBounds
+from Heuristic import greedySchedule
+from Colouring import assignHospitals
+from FixedWindows import fixedPatients, solveFixed
+from Presolve import presolve
+from Decomposition import solveDecomposed
+from SolverOptions import SolverOptions, STRATEGIES, loadTuned
+from Symmetry import symmetricClasses, addSymmetryBreaking, symmetricLines
+from Profiling import Profiler, logPresolve, cpsatStatistics
+from SolutionCache import SolutionCache, solveCached
+from ModelCache import ModelCache
+from Schedule import Schedule, writeSchedule, anytimeReporter, OPTIMAL, FEASIBLE, INFEASIBLE
+from Instance import parseInput
+import argparse
+import numpy as np
+import sys
 
-class Patient:
-    def __init__(self, r, d, x, l, p1, p2, gap):
-        self.r = r
-        self.d = d
-        self.x = x
-        self.l = l
-        self.firstPossible = [r, r + p1 + gap + x] #First possible time for first dose, first possible time for second dose (if first dose was taken at r)
-        self.lastPossible = [d - p1 + 1, d + gap + x + l - p2 + 1] #Last possible time for first dose, last possible time for second dose (if first dose processing ended at d)
+# The models SolveILP can use: hospitals inside the model, or a cumulative resource with hospitals assigned afterwards
+FORMULATIONS = ["nooverlap2d", "cumulative"]
 
 class PatientVariables:
-    def __init__(self, patient, model, programInput):
+    def __init__(self, patient, model, programInput, machineUpperBound=None):
         self.patient = patient
         self.createTimeDose1(model, programInput)
         self.createTimeDose2(model, programInput)
-        self.createMachineVars(model, programInput)
+        # Without a machine upper bound only the times are modelled, the hospitals are then assigned after solving
+        if machineUpperBound is not None:
+            self.createMachineVars(model, machineUpperBound)
     
     def createTimeDose1(self, model, programInput):
         patient = self.patient
@@ -48,82 +60,281 @@ class PatientVariables:
         # To force the upper bound for the starttime, we restrict the endtime. It must be less than, or equal to T1 + p1 + gap + x + l.
         model.Add(self.endtimeDose2 <= self.endtimeDose1 + programInput.gap + patient.x + patient.l)
 
-    def createMachineVars(self, model, programInput):
-        patient = self.patient
-        # Create vars that will hold the number of the machine of the doses
-        self.machineDose1 = model.NewIntVar(1, len(programInput.patients), "machineDose1")
-        self.machineDose2 = model.NewIntVar(1, len(programInput.patients), "machineDose2")
+    def createMachineVars(self, model, machineUpperBound):
+        # Create vars that will hold the number of the machine of the doses. An optimal schedule never needs a machine number above
+        # the upper bound computed before building the model.
+        self.machineDose1 = model.NewIntVar(1, machineUpperBound, "machineDose1")
+        self.machineDose2 = model.NewIntVar(1, machineUpperBound, "machineDose2")
 
         # Create an interval from machineNumber to machineNumber + 1. This will be used in a 2D overlap, to make sure that a 
         # machine isn"t booked by two patients on the same timeslot. Note we have to use + 1 for the same reason as intervalDose1.
         self.machineDose1Interval = model.NewIntervalVar(self.machineDose1, 1, self.machineDose1 + 1, "machineDose1Interval")
         self.machineDose2Interval = model.NewIntervalVar(self.machineDose2, 1, self.machineDose2 + 1, "machineDose2Interval")
 
-    def printSolutionLine(self, solver):
-        # First create an array of all variables that need their value printed (in the correct order)
+    def addHint(self, model, programInput, scheduleLine, hintMachines):
+        """Hints the solver with the [T1, M1, T2, M2] line of a known feasible schedule."""
+        T1, M1, T2, M2 = scheduleLine
+        model.AddHint(self.starttimeDose1, T1)
+        model.AddHint(self.endtimeDose1, T1 + programInput.p1 - 1)
+        model.AddHint(self.starttimeDose2, T2)
+        model.AddHint(self.endtimeDose2, T2 + programInput.p2 - 1)
+        if hintMachines:
+            model.AddHint(self.machineDose1, M1)
+            model.AddHint(self.machineDose2, M2)
+
+    def solutionLine(self, solver):
+        # First create an array of all variables that need their value in the schedule (in the correct order)
         relevantVars = [self.starttimeDose1, self.machineDose1, self.starttimeDose2, self.machineDose2]
         # Map a function over that array, that gets the value of all the variables (keeping them in the same order)
-        values = [solver.Value(var) for var in relevantVars]
-        # Print all the values
-        print(f"{values[0]}, {values[1]}, {values[2]}, {values[3]}")
+        return [solver.Value(var) for var in relevantVars]
+
+class FixedPatientVariables(PatientVariables):
+    """Variables of a patient whose dose times are fixed by its windows: the times are constants and the doses are fixed intervals, only
+    the hospitals are variables when they are modelled"""
+    def createTimeDose1(self, model, programInput):
+        self.starttimeDose1 = self.patient.r
+        self.intervalDose1 = model.NewFixedSizeIntervalVar(self.starttimeDose1, programInput.p1, "fixedDose1")
+
+    def createTimeDose2(self, model, programInput):
+        self.starttimeDose2 = self.patient.firstPossible[1]
+        self.intervalDose2 = model.NewFixedSizeIntervalVar(self.starttimeDose2, programInput.p2, "fixedDose2")
+
+    def addHint(self, model, programInput, scheduleLine, hintMachines):
+        if hintMachines:
+            model.AddHint(self.machineDose1, scheduleLine[1])
+            model.AddHint(self.machineDose2, scheduleLine[3])
+
+class StoredPatientVariables(PatientVariables):
+    """Variables of a patient of a model loaded from a ModelCache, found by their index in the model. The times of a patient whose
+    times are fixed are constants, the hospitals of the cumulative model are not part of it"""
+    def __init__(self, patient, model, indices):
+        self.patient = patient
+        start1, start2, machine1, machine2 = indices
+        self.starttimeDose1 = model.GetIntVarFromProtoIndex(start1) if start1 >= 0 else patient.firstPossible[0]
+        self.starttimeDose2 = model.GetIntVarFromProtoIndex(start2) if start2 >= 0 else patient.firstPossible[1]
+        if machine1 >= 0:
+            self.machineDose1 = model.GetIntVarFromProtoIndex(machine1)
+            self.machineDose2 = model.GetIntVarFromProtoIndex(machine2)
+
+class SolutionStreamer(cp_model.CpSolverSolutionCallback):
+    """Called by CP-SAT on every solution during the search, adds the ones that use fewer hospitals than best to the timeline of the
+    profiler, and passes them as a FEASIBLE Schedule to onSolution when it is not None"""
+    def __init__(self, onSolution, profiler, programInput, formulation, patientVariables, highestMachineNumber, bounds, best):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.onSolution = onSolution
+        self.profiler = profiler
+        self.model = (programInput, formulation, patientVariables, highestMachineNumber)
+        self.bounds = bounds
+        self.best = best
 
+    def on_solution_callback(self):
+        # The first solution is usually the hinted heuristic schedule, which was already passed on
+        if self.ObjectiveValue() >= self.best:
+            return
+        self.best = self.ObjectiveValue()
+        bound = int(self.BestObjectiveBound())
+        self.profiler.solution(int(self.best), bound)
+        if self.onSolution is not None:
+            self.onSolution(readSchedule(self, *self.model, status=FEASIBLE, bound=bound, bounds=self.bounds))
 
-class ProgramInput:
-    """All info read from input
+def SolveILP(programInput, formulation="nooverlap2d", decompose=False, timeLimit=1800, onSolution=None, options=None, profiler=None,
+             modelCache=None):
+    """Solves the input, returns the Schedule.
 
-    Attributes:
-        p1            Processing time for first dose
-        p2            Processing time for second dose
-        gap           Patient-independent delay between first and second dose
-        patients      Information of all patients
-        mintime[0/1]  Lowest possible time seen for first resp. second dose of any patient
-        maxtime[0/1]  Highest possible time seen for first resp. second dose of any patient
+    formulation is either "nooverlap2d", which assigns the hospitals inside the model, or "cumulative", which only schedules the dose
+    times against a cumulative resource with capacity M and assigns the hospitals afterwards. With decompose, the independent groups
+    of patients are solved in parallel. timeLimit is the time limit of the solver in seconds, when it is reached the best schedule found
+    so far is returned as FEASIBLE. onSolution is called with every improving Schedule, starting with the one of the heuristic. options
+    are the SolverOptions of CP-SAT, by default all cores are used. profiler is the Profiler that measures the phases, the schedule keeps
+    it as its profile. With a ModelCache as modelCache, the model of an input that was solved before is loaded instead of built, and a
+    new model is stored.
     """
-    def __init__(self, p1, p2, gap, patients, mintime, maxtime):
-        self.p1 = p1
-        self.p2 = p2
-        self.gap = gap
-        self.patients = patients
-        self.maxtime = maxtime
-        self.mintime = mintime
-
-def parsePatient(line, p1, p2, gap):
-    """Turns a comma seperated line into a patient object given the input-wide p1, p2 and gap."""
-    patientValues = [int(x.strip()) for x in line.split(",")]
-    return Patient(patientValues[0], patientValues[1], patientValues[2], patientValues[3], p1, p2, gap)
-
-def parseInput():
-    """Turns the input into a ProgramInput object"""
-    p1 = int(input())
-    p2 = int(input())
-    gap = int(input())
-    numPatients = int(input())
-    patients = []
-    maxtime = [0] * 2
-    mintime = [float("inf")] * 2 # Initiate minimum times as infinity
-    for i in range(0, numPatients):
-        patient = parsePatient(input(), p1, p2, gap)
-        patients.append(patient)
-        mintime[0] = min(mintime[0], patient.firstPossible[0])
-        maxtime[0] = max(maxtime[0], patient.lastPossible[0])
-        mintime[1] = min(mintime[1], patient.firstPossible[1])
-        maxtime[1] = max(maxtime[1], patient.lastPossible[1])
-    
-    return ProgramInput(p1, p2, gap, patients, mintime, maxtime)
+    options = SolverOptions() if options is None else options
+    profiler = Profiler() if profiler is None else profiler
+    if decompose:
+        schedule = solveDecomposed(programInput, "OfflineCPSAT", formulation, timeLimit, options=options, modelCache=modelCache)
+        profiler.lap("decomposed")
+        schedule.profile = profiler
+        if onSolution is not None and schedule.hasSolution():
+            onSolution(schedule)
+        return schedule
 
-def SolveILP(programInput):
     if len(programInput.patients) == 0:
-        print(0)
-        return "S"
-        
-    # Create the model and solver
-    model = cp_model.CpModel()
+        return Schedule([], [], [], [], 0)
+
+    # Patients whose windows leave no choice are not solved for, when all patients are like that the colouring of their doses is optimal
+    fixed = fixedPatients(programInput)
+    if fixed.all():
+        schedule = solveFixed(programInput, profiler)
+        if onSolution is not None:
+            onSolution(schedule)
+        return schedule
+
+    phases = profiler.phases
+    stats = profiler.model
+    # An input with a patient whose windows are empty is infeasible without solving. Every patient keeps its own intervals in the model,
+    # identical patients are only ordered with the symmetry option.
+    presolved = presolve(programInput)
+    stats["groups"] = len(presolved.multiplicity)
+    profiler.lap("presolve")
+    if presolved.infeasible():
+        return Schedule.noSolution(INFEASIBLE, phases=phases, stats=stats, profile=profiler)
     solver = cp_model.CpSolver()
 
-    patients = programInput.patients
+    # A model that was stored by an earlier run on the same input is loaded, its sidecar holds the heuristic schedule and the bounds
+    modelName = formulation + ("-symmetry" if options.symmetry else "")
+    stored = None if modelCache is None else modelCache.load(programInput, modelName, "pbtxt")
+    if stored is not None:
+        model, patientVariables, highestMachineNumber, heuristic, heuristicMachines, lowerBound, upperBound = loadModel(programInput, *stored)
+        stats.update(stored[1]["stats"])
+        profiler.lap("load")
+    else:
+        # Find a feasible schedule with the greedy heuristic, it is used as upper bound and as a warm start for the solver
+        heuristic, heuristicMachines = greedySchedule(programInput)
+
+        # Compute the bounds on the number of machines up front, so the solver does not have to prove them
+        lowerBound, upperBound = computeBounds(programInput, heuristicMachines)
+        profiler.lap("bounds")
+
+    # The schedule of the heuristic is the first incumbent. It is returned when the solver finds nothing better within the time limit,
+    # and it is optimal as is when it meets the lower bound.
+    heuristicSchedule = Schedule.fromLines(heuristic, heuristicMachines, status=FEASIBLE, bound=lowerBound, bounds=(lowerBound, upperBound),
+                                           phases=phases, stats=stats, profile=profiler)
+    if heuristicMachines <= lowerBound:
+        heuristicSchedule.status = OPTIMAL
+    profiler.solution(heuristicMachines, lowerBound)
+    if onSolution is not None:
+        onSolution(heuristicSchedule)
+    if heuristicSchedule.status == OPTIMAL:
+        return heuristicSchedule
+
+    if stored is None:
+        model, patientVariables, highestMachineNumber = buildModel(programInput, formulation, options, fixed, heuristic, heuristicMachines,
+                                                                   lowerBound, upperBound, stats)
+        profiler.lap("build")
+        if modelCache is not None:
+            storeModel(modelCache, modelName, programInput, model, patientVariables, highestMachineNumber, heuristic, heuristicMachines,
+                       lowerBound, upperBound, stats)
+            profiler.lap("store")
+
+    # Set time limit, 30 minutes by default, and the workers, strategy, presolve and LNS of the options
+    solver.parameters.max_time_in_seconds = timeLimit
+    options.apply(solver)
+    timeVariables = [variable for patient, isFixed in zip(patientVariables, fixed.tolist()) if not isFixed
+                     for variable in (patient.starttimeDose1, patient.starttimeDose2)]
+    machineVariables = [] if formulation == "cumulative" else [variable for patient in patientVariables
+                                                               for variable in (patient.machineDose1, patient.machineDose2)]
+    options.addDecisionStrategy(model, timeVariables, machineVariables)
+
+    # Solve the model, the improving solutions and bounds go to the timeline of the profiler, and the solutions to onSolution
+    logPresolve(solver, profiler)
+    solver.best_bound_callback = lambda bound: profiler.bound(int(bound))
+    status = solver.Solve(model, SolutionStreamer(onSolution, profiler, programInput, formulation, patientVariables, highestMachineNumber,
+                                                  (lowerBound, upperBound), heuristicMachines))
+    profiler.search.update(cpsatStatistics(solver))
+    profiler.lap("solve")
+
+    if status == cp_model.INFEASIBLE:
+        return Schedule.noSolution(INFEASIBLE, bounds=(lowerBound, upperBound), phases=phases, stats=stats, profile=profiler)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        # No solution within the time limit, the heuristic schedule is the best one known
+        return heuristicSchedule
+
+    schedule = readSchedule(solver, programInput, formulation, patientVariables, highestMachineNumber,
+                            status=OPTIMAL if status == cp_model.OPTIMAL else FEASIBLE, bound=int(solver.BestObjectiveBound()),
+                            bounds=(lowerBound, upperBound), phases=phases, stats=stats, profile=profiler)
+    profiler.lap("extract")
+    return schedule
+
+def buildModel(programInput, formulation, options, fixed, heuristic, heuristicMachines, lowerBound, upperBound, stats):
+    """Builds the CP-SAT model of the formulation, hinted with the [T1, M1, T2, M2] lines of the heuristic schedule, and adds its size
+    to stats. Returns (model, patientVariables, highestMachineNumber)."""
+    model = cp_model.CpModel()
+
+    # Create a variable that holds the number of machines, we will minimise this later
+    highestMachineNumber = model.NewIntVar(lowerBound, upperBound, "M")
+    hintMachines = heuristicMachines <= upperBound
+    if hintMachines:
+        model.AddHint(highestMachineNumber, heuristicMachines)
+
+    if formulation == "cumulative":
+        patientVariables = addCumulativeModel(model, programInput, highestMachineNumber, fixed)
+        hintMachines = False
+    else:
+        patientVariables = addNoOverlap2DModel(model, programInput, highestMachineNumber, upperBound, fixed=fixed)
+
+    if options.symmetry:
+        # Keep one schedule of every group of equivalent ones, the heuristic schedule is changed into the one that is kept
+        classes = symmetricClasses(programInput, fixed)
+        addSymmetryBreaking(model, programInput, patientVariables, classes, None if formulation == "cumulative" else upperBound)
+        heuristic = symmetricLines(heuristic, classes, formulation != "cumulative")
+        stats["symmetric classes"] = len(classes)
+
+    # Hint the solver with the heuristic schedule. The machine numbers can only be hinted if they fit in the capped machine domain.
+    for patient, scheduleLine in zip(patientVariables, heuristic):
+        patient.addHint(model, programInput, scheduleLine, hintMachines)
+
+    # Minimise the highest machine number. The reason that we can use this maximum, is that every machine is used only over a processing time.
+    # (This is enforced by the overlap constraint). This means that any maximum number that we see, must be the number of concurrent machine that are
+    # required at a single point in time. This is true because we minimise M, thus the solver will try to minimise the machine numbers. The only way a
+    # machine cannot be lower is if that time was already taken up by another job.
+    model.Minimize(highestMachineNumber)
+    modelSize = model.Proto()
+    stats["variables"] = len(modelSize.variables)
+    stats["constraints"] = len(modelSize.constraints)
+    return model, patientVariables, highestMachineNumber
+
+def storeModel(modelCache, modelName, programInput, model, patientVariables, highestMachineNumber, heuristic, heuristicMachines,
+               lowerBound, upperBound, stats):
+    """Stores the model in modelCache, before the decision strategy of the options is added to it. The sidecar holds the indices of the
+    variables of every patient, -1 for a constant time or a hospital that is not modelled, and the heuristic schedule and the bounds."""
+    def index(patient, name):
+        variable = getattr(patient, name, None)
+        return variable.Index() if isinstance(variable, cp_model.IntVar) else -1
+
+    columns = {name: [index(patient, name) for patient in patientVariables]
+               for name in ("starttimeDose1", "starttimeDose2", "machineDose1", "machineDose2")}
+    for column, name in enumerate(("T1", "M1", "T2", "M2")):
+        columns[name] = [line[column] for line in heuristic]
+    sidecar = {"M": highestMachineNumber.Index(), "machines": heuristicMachines, "bounds": [lowerBound, upperBound], "stats": stats,
+               "columns": columns}
+    # The CP-SAT model is written as text, the Python wrapper of the model can only parse that format back
+    modelCache.save(programInput, modelName, {"pbtxt": model.ExportToFile}, sidecar)
+
+def loadModel(programInput, modelPath, sidecar):
+    """Loads a model stored by storeModel, returns (model, patientVariables, highestMachineNumber, heuristic, heuristicMachines,
+    lowerBound, upperBound)."""
+    model = cp_model.CpModel()
+    with open(modelPath, "r") as fd:
+        model.Proto().parse_text_format(fd.read())
+    columns = sidecar["columns"]
+    indices = zip(columns["starttimeDose1"].tolist(), columns["starttimeDose2"].tolist(), columns["machineDose1"].tolist(),
+                  columns["machineDose2"].tolist())
+    patientVariables = [StoredPatientVariables(patient, model, patientIndices) for patient, patientIndices in zip(programInput.patients, indices)]
+    heuristic = np.stack([columns["T1"], columns["M1"], columns["T2"], columns["M2"]], axis=1).tolist()
+    lowerBound, upperBound = sidecar["bounds"]
+    return model, patientVariables, model.GetIntVarFromProtoIndex(sidecar["M"]), heuristic, sidecar["machines"], lowerBound, upperBound
+
+def readSchedule(values, programInput, formulation, patientVariables, highestMachineNumber, **kwargs):
+    """Reads the Schedule out of the values of the variables, values is either the solver or a solution callback."""
+    if formulation == "cumulative":
+        # The model only fixed the times, the hospitals follow from colouring the intervals
+        times = [[values.Value(patient.starttimeDose1), values.Value(patient.starttimeDose2)] for patient in patientVariables]
+        lines, machines = assignHospitals(programInput, times)
+    else:
+        lines = [patient.solutionLine(values) for patient in patientVariables]
+        machines = values.Value(highestMachineNumber)
+    return Schedule.fromLines(lines, machines, **kwargs)
+
+def addNoOverlap2DModel(model, programInput, highestMachineNumber, upperBound, fixedDoses=(), fixed=None):
+    """Adds the time and machine variables of every patient, with a 2D no-overlap over time intervals x machine intervals.
 
+    fixedDoses holds (start, end, machine) of doses that are already scheduled, they occupy their hospital in [start, end) but are not
+    counted in highestMachineNumber. fixed can hold the result of fixedPatients, those patients only get machine variables. Returns the
+    PatientVariables of all patients.
+    """
     # Set up all the variables for each patient
-    patientVariables = [PatientVariables(patient, model, programInput) for patient in patients]
+    patientVariables = createPatientVariables(model, programInput, fixed, upperBound)
 
     # Array that will keep all the intervalDose1 and intervalDose2 intervals
     intervals = []
@@ -139,6 +350,11 @@ def SolveILP(programInput):
         machineIntervals.append(patient.machineDose2Interval)
         machines.append(patient.machineDose1)
         machines.append(patient.machineDose2)
+
+    # Doses that were scheduled before, such as the committed doses of the rolling horizon, are fixed intervals on their hospital
+    for start, end, machine in fixedDoses:
+        intervals.append(model.NewFixedSizeIntervalVar(start, end - start, "fixedDose"))
+        machineIntervals.append(model.NewFixedSizeIntervalVar(machine, 1, "fixedMachine"))
     
     # We do a 2D overlap that works in the following way.
     # The overlap will check if there is an overlap between the time intervals and the machinenumber intervals.
@@ -155,30 +371,91 @@ def SolveILP(programInput):
     # timeslot, and as the endtime spans a full timeslot, it will be set to the beginning of the next timeslot, but it won"t overlap with that.
     model.AddNoOverlap2D(intervals, machineIntervals)
 
-    # Create a variable that holds the highest machine number that was found, we will minimise this later
-    highestMachineNumber = model.NewIntVar(1, len(patients), "M")
+    # M is the highest machine number that is used
     model.AddMaxEquality(highestMachineNumber, machines)
+    return patientVariables
 
-    # Minimise the highest machine number. The reason that we can use this maximum, is that every machine is used only over a processing time.
-    # (This is enforced by the overlap constraint). This means that any maximum number that we see, must be the number of concurrent machine that are
-    # required at a single point in time. This is true because we minimise M, thus the solver will try to minimise the machine numbers. The only way a
-    # machine cannot be lower is if that time was already taken up by another job.
-    model.Minimize(highestMachineNumber)
+def addCumulativeModel(model, programInput, highestMachineNumber, fixed=None):
+    """Adds only the time variables of every patient, with all dose intervals on a single cumulative resource of capacity M.
 
-    # Set time limit to 30 minutes
-    solver.parameters.max_time_in_seconds = 1800
+    The hospitals are not part of this model, which removes the 2n machine variables and their symmetry. Because every dose occupies
+    one hospital, a schedule that never has more than M doses at the same time can always be assigned to M hospitals afterwards.
+    The patients in fixed, the result of fixedPatients, are constant occupancy of the resource. Returns the PatientVariables of all
+    patients.
+    """
+    patientVariables = createPatientVariables(model, programInput, fixed)
 
-    # Solve the model and print the solution
-    status = solver.Solve(model)
-    if status == cp_model.OPTIMAL:
-        for patient in patientVariables:
-            patient.printSolutionLine(solver)
-        print(f"{solver.Value(highestMachineNumber)}")
-    else:
-        print("Could not find a solution")
-        return "-"
-    
-    return "S"
+    intervals = []
+    for patient in patientVariables:
+        intervals.append(patient.intervalDose1)
+        intervals.append(patient.intervalDose2)
+
+    # Every dose takes one hospital, at no point in time there may be more doses than hospitals
+    model.AddCumulative(intervals, [1] * len(intervals), highestMachineNumber)
+    return patientVariables
+
+def createPatientVariables(model, programInput, fixed=None, machineUpperBound=None):
+    """Returns the PatientVariables of every patient, FixedPatientVariables for the patients in fixed."""
+    if fixed is None:
+        return [PatientVariables(patient, model, programInput, machineUpperBound) for patient in programInput.patients]
+    return [(FixedPatientVariables if isFixed else PatientVariables)(patient, model, programInput, machineUpperBound)
+            for patient, isFixed in zip(programInput.patients, fixed.tolist())]
+
+def solveHeuristic(programInput):
+    """Returns the Schedule of the greedy heuristic, without running the solver"""
+    lines, machines = greedySchedule(programInput)
+    return Schedule.fromLines(lines, machines, status=FEASIBLE, bound=computeBounds(programInput, machines)[0])
 
 if __name__ == "__main__":
-    SolveILP(parseInput())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--heuristic-only", action="store_true", help="only run the greedy heuristic, for instances too big to solve exactly")
+    parser.add_argument("--formulation", choices=FORMULATIONS, default="nooverlap2d", help="model to solve the input with")
+    parser.add_argument("--decompose", action="store_true", help="solve independent groups of patients in parallel")
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit of the solver in seconds, the best schedule found by then is output")
+    parser.add_argument("--anytime", action="store_true", help="report every improving schedule on stderr while solving")
+    parser.add_argument("--incumbent", help="file to write every improving schedule to while solving")
+    parser.add_argument("--workers", type=int, default=None, help="number of search workers, all cores by default")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="automatic", help="variables the search branches on first")
+    parser.add_argument("--fixed-search", action="store_true", help="follow the strategy exactly instead of using it as a hint")
+    parser.add_argument("--no-presolve", action="store_true", help="do not presolve the model")
+    parser.add_argument("--probing-level", type=int, default=2, help="effort of the probing during presolve, 0 to 3")
+    parser.add_argument("--no-lns", action="store_true", help="do not use the large neighbourhood search workers")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the solver")
+    parser.add_argument("--symmetry", action="store_true", help="order identical patients, which only pays off on inputs with many of them")
+    parser.add_argument("--tuned", help="json file written by Tune.py, the fastest formulation and options for the size of the input are used")
+    parser.add_argument("--cache", help="directory of the solution cache, inputs that were solved before are not solved again")
+    parser.add_argument("--cache-size", type=float, default=1024, help="size of the solution cache in MB")
+    parser.add_argument("--model-cache", help="directory to store the built models in, the model of an input that was solved before is loaded")
+    parser.add_argument("--profile", help="json file to write the time, memory, model size and search statistics of every phase to")
+    parser.add_argument("--trace", help="file to write the phases and solutions to, in the trace event format of chrome://tracing")
+    args = parser.parse_args()
+
+    profiler = Profiler()
+
+    programInput = parseInput()
+    profiler.lap("parse")
+    formulation = args.formulation
+    options = SolverOptions(args.workers, args.strategy, args.fixed_search, not args.no_presolve, args.probing_level, not args.no_lns, args.seed,
+                            args.symmetry)
+    if args.tuned:
+        formulation, options = loadTuned(args.tuned, len(programInput.patients))
+    onSolution = anytimeReporter(args.incumbent) if args.anytime or args.incumbent else None
+    cache = SolutionCache(args.cache, int(args.cache_size * 1024 * 1024)) if args.cache else None
+    modelCache = ModelCache(args.model_cache) if args.model_cache else None
+    if args.heuristic_only:
+        schedule = solveHeuristic(programInput)
+        profiler.lap("heuristic")
+    else:
+        schedule = solveCached(cache, programInput, f"OfflineCPSAT {formulation}",
+                               lambda programInput: SolveILP(programInput, formulation, args.decompose, args.time_limit, onSolution, options,
+                                                                     profiler, modelCache))
+    if cache is not None:
+        profiler.lap("cache")
+    writeSchedule(schedule)
+    profiler.lap("output")
+    print(schedule.summary(), file=sys.stderr)
+    if args.profile:
+        profiler.writeRecord(args.profile)
+        print(profiler.summary(), file=sys.stderr)
+    if args.trace:
+        profiler.writeTrace(args.trace)
\ No newline at end of file
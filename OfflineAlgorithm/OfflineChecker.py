@@ -2,72 +2,129 @@
 
 """Output checker for OfflineCPSAT.py, the program by the Federal Vaccination Agency to schedule vaccinations. Will check if the output is consistent with the input"""
 import OfflineCPSAT as offline
+from SolutionCache import SolutionCache, solveCached
+from Profiling import Profiler
+import argparse
 import sys
-import os
+import numpy as np
 from time import perf_counter
 
 
-class PatientOutput:
-    def __init__(self, line):
-        ints = [int(x.strip()) for x in line.split(",")]
-        self.T1 = ints[0]
-        self.M1 = ints[1]
-        self.T2 = ints[2]
-        self.M2 = ints[3]
+class Violation:
+    """A constraint of the problem that a schedule does not satisfy
 
-    def checkRange(self, patientInput, programInput):
-        t1Correct = patientInput.r <= self.T1 <= patientInput.d - programInput.p1 + 1
-        t2Correct = self.T1 + programInput.p1 + programInput.gap + patientInput.x <= self.T2 <= self.T1 + programInput.p1 + programInput.gap + patientInput.x + patientInput.l - programInput.p2
-        return t1Correct and t2Correct
+    Attributes:
+        kind          "window" when a dose is outside its feasible window, "hospital" when a hospital number is not in 1..machines,
+                      "overlap" when a hospital is double booked
+        job           Index of the patient
+        dose          Dose of the patient (1 or 2) that is scheduled wrongly, None for "window" violations of the first dose
+        hospital      Hospital that is double booked or out of range, None for "window" violations
+        time          First timeslot that is double booked, None for other violations
+        otherJob      Index of the patient that the hospital is also booked for, None for other violations
+        otherDose     Dose of that other patient, None for other violations
+    """
+    def __init__(self, kind, job, dose=None, hospital=None, time=None, otherJob=None, otherDose=None):
+        self.kind = kind
+        self.job = job
+        self.dose = dose
+        self.hospital = hospital
+        self.time = time
+        self.otherJob = otherJob
+        self.otherDose = otherDose
+
+    def __str__(self):
+        if self.kind == "window":
+            return f"Job {self.job} scheduled outside its feasible schedule"
+        if self.kind == "hospital":
+            return f"Job {self.job} uses hospital {self.hospital} for dose {self.dose}, which is not in the schedule"
+        return f"Hospital {self.hospital} double booked at time {self.time} for dose {self.dose} by job {self.job+1} and job {self.otherJob+1}"
+
+def verifySchedule(programInput, schedule):
+    """Checks the schedule against the input, returns the list of all violations (empty when the schedule is feasible)."""
+    p1 = programInput.p1
+    p2 = programInput.p2
+    T1 = np.asarray(schedule.T1, dtype=np.int64)
+    M1 = np.asarray(schedule.M1, dtype=np.int64)
+    T2 = np.asarray(schedule.T2, dtype=np.int64)
+    M2 = np.asarray(schedule.M2, dtype=np.int64)
+    violations = []
+
+    # T1 ∈ [r, d - p1 + 1] and T2 ∈ [T1 + p1 + gap + x, T1 + p1 + gap + x + l - p2]
+    earliestT2 = T1 + p1 + programInput.gap + programInput.x
+    inWindow = (programInput.r <= T1) & (T1 <= programInput.d - p1 + 1) & (earliestT2 <= T2) & (T2 <= earliestT2 + programInput.l - p2)
+    for job in np.flatnonzero(~inWindow).tolist():
+        violations.append(Violation("window", job))
+
+    # Every hospital has to be one of the hospitals 1..machines
+    for dose, hospitals in ((1, M1), (2, M2)):
+        for job in np.flatnonzero((hospitals < 1) | (hospitals > schedule.machines)).tolist():
+            violations.append(Violation("hospital", job, dose, int(hospitals[job])))
+
+    violations.extend(findOverlaps(np.concatenate([T1, T2]), np.concatenate([T1 + p1, T2 + p2]), np.concatenate([M1, M2])))
+    return violations
+
+def findOverlaps(starts, ends, hospitals):
+    """Finds all doses that start while an earlier dose on the same hospital is still running.
+
+    The doses are sorted per hospital by start time, and swept while keeping the latest end seen so far on the hospital. Dose i of the
+    arrays belongs to job i % numPatients, the first half of the arrays are first doses and the second half second doses.
+    """
+    numPatients = len(starts) // 2
+    if len(starts) == 0:
+        return []
+    order = np.lexsort((starts, hospitals))
+    starts = starts[order]
+    ends = ends[order]
+    hospitals = hospitals[order]
+
+    # Running maximum of the end time per hospital. Ends are shifted so that all hospitals get their own range of values, then a single
+    # running maximum over all doses never mixes the ends of two hospitals.
+    offset = starts.min()
+    width = int(ends.max() - offset) + 1
+    encoded = (hospitals - hospitals.min()) * width + (ends - offset)
+    runningMax = np.maximum.accumulate(encoded)
+    # Position of the dose that holds the running maximum, to report which dose is overlapped
+    index = np.arange(len(encoded))
+    holder = np.maximum.accumulate(np.where(encoded == runningMax, index, 0))
+
+    sameHospital = hospitals[1:] == hospitals[:-1]
+    overlapping = sameHospital & (starts[1:] < (runningMax[:-1] % width) + offset)
+    violations = []
+    for position in (np.flatnonzero(overlapping) + 1).tolist():
+        dose = order[position]
+        other = order[holder[position - 1]]
+        violations.append(Violation("overlap", int(dose % numPatients), int(dose // numPatients) + 1, int(hospitals[position]),
+                                    int(starts[position]), int(other % numPatients), int(other // numPatients) + 1))
+    return violations
 
 if __name__ == "__main__":
-    #os.remove("output.txt")
-    oldOut = sys.stdout
-    fd = open("output.txt", "w+")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--formulation", choices=offline.FORMULATIONS, default="nooverlap2d", help="model of OfflineCPSAT.py to check")
+    parser.add_argument("--cache", help="directory of the solution cache, to check the cached schedule of an input that was solved before")
+    args = parser.parse_args()
 
-    sys.stdout = fd
+    profiler = Profiler()
     programInput = offline.parseInput()
+    profiler.lap("parse")
     start = perf_counter()
-    offline.SolveILP(programInput)
+    cache = SolutionCache(args.cache) if args.cache else None
+    schedule = solveCached(cache, programInput, f"OfflineCPSAT {args.formulation}",
+                           lambda programInput: offline.SolveILP(programInput, args.formulation, profiler=profiler))
     end = perf_counter()
-    fd.close()
-    sys.stdout = oldOut
-
-    machinesInUse = [None] * (len(programInput.patients) + 1)
-    for i in range(1, len(machinesInUse)):
-        machinesInUse[i] = { }
-
-    fd = open("output.txt", "r")
-    patients = []
-    lines = fd.read().split("\n")
-    for line in lines:
-        try:
-            patients.append(PatientOutput(line))
-        except:
-            pass
-
-    print(f"Total machines: {lines[len(lines)-2]}")
-    allConsistent = True
-    for i in range(0, len(patients)):
-        if not patients[i].checkRange(programInput.patients[i], programInput):
-            print(f"Job {i} scheduled outside its feasible schedule")
-            allConsistent = False
-        
-        allTimesInUse = range(patients[i].T1, patients[i].T1 + programInput.p1)
-        for time in allTimesInUse:
-            if time in machinesInUse[patients[i].M1]:
-                print(f"Hospital {patients[i].M1} double booked at time {time} for dose 1 by job {i+1} and job {machinesInUse[patients[i].M1][time]+1}")
-            else:
-                machinesInUse[patients[i].M1][time] = i
-
-        allTimesInUse = range(patients[i].T2, patients[i].T2 + programInput.p2)
-        for time in allTimesInUse:
-            if time in machinesInUse[patients[i].M2]:
-                print(f"Hospital {patients[i].M2} double booked at time {time} for dose 2 by job {i+1} and job {machinesInUse[patients[i].M2][time]+1}")
-            else:
-                machinesInUse[patients[i].M2][time] = i
-    
-    if allConsistent:
+    if cache is not None:
+        profiler.lap("cache")
+
+    if not schedule.hasSolution():
+        print(f"Solver did not find a schedule ({schedule.status})")
+        sys.exit(1)
+
+    print(f"Total machines: {schedule.machines}")
+    violations = verifySchedule(programInput, schedule)
+    for violation in violations:
+        print(violation)
+
+    if not any(violation.kind == "window" for violation in violations):
         print("All jobs consistent")
     print(f"Solver took a total of {end - start} seconds")
-    print(f"Checker took a total of {perf_counter() - end} seconds")
\ No newline at end of file
+    print(profiler.summary())
+    print(f"Checker took a total of {perf_counter() - end} seconds")
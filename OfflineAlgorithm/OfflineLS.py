@@ -1,69 +1,396 @@
 #!/usr/bin/env python3
 
 """Offline algorithm of the Federal Vaccination Agency, to find the best schedule for vaccinating the population of a small country."""
-from ortools.linear_solver import pywraplp
-
-class Patient:
-    def __init__(self, r, d, x, l, p1, p2, gap):
-        self.r = r
-        self.d = d
-        self.x = x
-        self.l = l
-        self.firstPossible = [r, r + p1 + gap + x] #First possible time for first dose, first possible time for second dose (if first dose was taken at r)
-        self.lastPossible = [d - p1 + 1, d + gap + x + l - p2 + 1] #Last possible time for first dose, last possible time for second dose (if first dose processing ended at d)
-# S <= d - p1 + g + x + l + p1 - p2
-class ProgramInput:
-    """All info read from input
-
-    Attributes:
-        p1            Processing time for first dose
-        p2            Processing time for second dose
-        gap           Patient-independent delay between first and second dose
-        patients      Information of all patients
-        mintime[0,1]  Lowest possible time seen for first resp. second dose of any patient
-        maxtime[0,1]  Highest possible time seen for first resp. second dose of any patient
+from ortools.linear_solver import pywraplp, linear_solver_pb2
+from Bounds import computeBounds
+from Heuristic import greedySchedule
+from Colouring import assignHospitals
+from FixedWindows import fixedPatients, occupancy, solveFixed
+from Presolve import presolve, expandTimes, timeScale, scaleInput, unscaleSchedule
+from Decomposition import solveDecomposed
+from Schedule import Schedule, writeSchedule, anytimeReporter, OPTIMAL, FEASIBLE, INFEASIBLE, TIMEOUT
+from SolutionCache import SolutionCache, solveCached
+from ModelCache import ModelCache
+from Profiling import Profiler
+from Instance import parseInput
+import argparse
+import math
+import numpy as np
+import sys
+from time import perf_counter
+
+# The models SolveILP can use: sparse without machine index, or the dense formulation of the paper
+FORMULATIONS = ["sparse", "dense"]
+# Largest model SolveILP builds, in estimated coefficients of its constraints. A time-indexed model grows with the length of the windows
+# times the processing times, an input with windows of millions of timeslots would not fit in memory.
+MAX_COEFFICIENTS = 10_000_000
+
+def SolveILP(programInput, formulation="sparse", decompose=False, timeLimit=1800, onSolution=None, profiler=None, modelCache=None,
+             maxCoefficients=MAX_COEFFICIENTS):
+    """Solves the input, returns the Schedule.
+
+    formulation is either "sparse", which only has variables inside the feasible window of every patient and assigns the hospitals after
+    solving, or "dense", the formulation of the paper with a variable for every job x timeslot x machine. With decompose, the independent
+    groups of patients are solved in parallel. timeLimit is the time limit in seconds of building and solving the model, when it is
+    reached the best schedule found so far is returned as FEASIBLE. When the model would have more than maxCoefficients coefficients it is
+    not built, and the schedule of the heuristic is returned. onSolution is called with the schedule of the heuristic and with the final schedule; SCIP does
+    not report its incumbents to Python while it is running. profiler is the Profiler that measures the phases, the schedule keeps it as
+    its profile. With a ModelCache as modelCache, the sparse model of an input that was solved before is loaded instead of built, and a
+    new sparse model is stored.
     """
-    def __init__(self, p1, p2, gap, patients, mintime, maxtime):
-        self.p1 = p1
-        self.p2 = p2
-        self.gap = gap
-        self.patients = patients
-        self.maxtime = maxtime
-        self.mintime = mintime
-
-def parsePatient(line, p1, p2, gap):
-    """Turns a comma seperated line into a patient object given the input-wide p1, p2 and gap."""
-    patientValues = [int(x.strip()) for x in line.split(",")]
-    return Patient(patientValues[0], patientValues[1], patientValues[2], patientValues[3], p1, p2, gap)
-
-def parseInput():
-    """Turns the input into a ProgramInput object"""
-    p1 = int(input())
-    p2 = int(input())
-    gap = int(input())
-    numPatients = int(input())
-    patients = []
-    maxtime = [0] * 2
-    mintime = [float("inf")] * 2 # Initiate minimum times as infinity
-    for i in range(0, numPatients):
-        patient = parsePatient(input(), p1, p2, gap)
-        patients.append(patient)
-        mintime[0] = min(mintime[0], patient.firstPossible[0])
-        maxtime[0] = max(maxtime[0], patient.lastPossible[0])
-        mintime[1] = min(mintime[1], patient.firstPossible[1])
-        maxtime[1] = max(maxtime[1], patient.lastPossible[1])
-    return ProgramInput(p1, p2, gap, patients, mintime, maxtime)
-
-def SolveILP(programInput):
+    profiler = Profiler() if profiler is None else profiler
+    deadline = perf_counter() + timeLimit
+    if decompose:
+        schedule = solveDecomposed(programInput, "OfflineLS", formulation, timeLimit, modelCache=modelCache)
+        profiler.lap("decomposed")
+        schedule.profile = profiler
+        if onSolution is not None and schedule.hasSolution():
+            onSolution(schedule)
+        return schedule
+
     if len(programInput.patients) == 0:
-        print(0)
-        return "S"
-    # Create the mip solver with the SCIP backend.
+        return Schedule([], [], [], [], 0)
+    # Patients whose windows leave no choice are not solved for, when all patients are like that the colouring of their doses is optimal
+    if fixedPatients(programInput).all():
+        schedule = solveFixed(programInput, profiler)
+        if onSolution is not None:
+            onSolution(schedule)
+        return schedule
+
+    # An input whose times are all on a grid coarser than one timeslot is solved on that grid, with factor times fewer timeslots
+    factor, offset = timeScale(programInput)
+    if factor > 1:
+        profiler.model["time scale"] = factor
+        onScaledSolution = None if onSolution is None else lambda schedule: onSolution(unscaleSchedule(schedule, factor, offset))
+        schedule = SolveILP(scaleInput(programInput, factor, offset), formulation, False, timeLimit, onScaledSolution, profiler, modelCache,
+                            maxCoefficients)
+        return unscaleSchedule(schedule, factor, offset)
+
+    # Identical patients are grouped, and an input with a patient whose windows are empty is infeasible without solving
+    presolved = presolve(programInput)
+    profiler.model["groups"] = len(presolved.multiplicity)
+    profiler.model["forced doses"] = int((presolved.forced * presolved.multiplicity).sum())
+    profiler.lap("presolve")
+    if presolved.infeasible():
+        return Schedule.noSolution(INFEASIBLE, phases=profiler.phases, stats=profiler.model, profile=profiler)
+
+    # A sparse model that was stored by an earlier run on the same input is loaded, its sidecar holds the heuristic schedule and the bounds
+    stored = None if modelCache is None or formulation != "sparse" else modelCache.load(programInput, formulation, "pb")
+    if stored is not None:
+        columns = stored[1]["columns"]
+        heuristic = np.stack([columns["T1"], columns["M1"], columns["T2"], columns["M2"]], axis=1).tolist()
+        heuristicMachines = stored[1]["machines"]
+        lowerBound, upperBound = stored[1]["bounds"]
+    else:
+        # Compute the bounds on the number of machines up front, machines above the upper bound are never needed
+        heuristic, heuristicMachines = greedySchedule(programInput)
+        lowerBound, upperBound = computeBounds(programInput, heuristicMachines)
+        profiler.lap("bounds")
+    result = {"bounds": (lowerBound, upperBound), "phases": profiler.phases, "stats": profiler.model, "profile": profiler}
+
+    # The schedule of the heuristic is the first incumbent, it is optimal as is when it meets the lower bound
+    heuristicSchedule = Schedule.fromLines(heuristic, heuristicMachines, status=FEASIBLE, bound=lowerBound, **result)
+    if heuristicMachines <= lowerBound:
+        heuristicSchedule.status = OPTIMAL
+    profiler.solution(heuristicMachines, lowerBound)
+    if onSolution is not None:
+        onSolution(heuristicSchedule)
+    if heuristicSchedule.status == OPTIMAL:
+        return heuristicSchedule
+
+    # A model that does not fit in memory is not built, the schedule of the heuristic is the best one known
+    if stored is None:
+        coefficients = modelCoefficients(programInput, presolved, formulation, upperBound)
+        profiler.model["estimated coefficients"] = coefficients
+        if coefficients > maxCoefficients:
+            print(f"The {formulation} model would have about {coefficients} coefficients, more than {maxCoefficients}, the schedule of the "
+                  "heuristic is returned", file=sys.stderr)
+            return heuristicSchedule
+
+    # Create the mip solver with the SCIP backend, the time limit of 30 minutes by default covers building the model too
     solver = pywraplp.Solver.CreateSolver("SCIP")
 
+    if formulation == "dense":
+        schedule = solveDense(solver, programInput, result, deadline)
+    else:
+        schedule = solveSparse(solver, programInput, result, heuristicSchedule, modelCache, stored, presolved, deadline)
+
+    if schedule.status == TIMEOUT or (schedule.status == FEASIBLE and schedule.machines > heuristicMachines):
+        # SCIP did not beat the heuristic within the time limit, keep its bound with the schedule of the heuristic
+        heuristicSchedule.bound = max(lowerBound, schedule.bound or lowerBound)
+        schedule = heuristicSchedule
+    if schedule is not heuristicSchedule and schedule.hasSolution():
+        profiler.solution(schedule.machines, schedule.bound)
+        if onSolution is not None:
+            onSolution(schedule)
+    return schedule
+
+def modelCoefficients(programInput, presolved, formulation, upperBound):
+    """Returns an estimate of the number of coefficients in the constraints of the model of the formulation, which is what its memory
+    grows with. Every time-indexed variable of a dose is in the capacity constraints of the p timeslots it occupies, and in a few
+    others."""
+    p1 = programInput.p1
+    p2 = programInput.p2
+    if formulation == "dense":
+        # A variable for every job x timeslot x machine, over the timeslots of all patients
+        timeslots1 = int(programInput.maxtime[0]) - int(programInput.mintime[0]) + 1
+        timeslots2 = int(programInput.maxtime[1]) - int(programInput.mintime[1]) + 1
+        return len(programInput.patients) * (upperBound + 1) * (timeslots1 * (p1 + 4) + timeslots2 * (p2 + 4))
+    # A variable for every timeslot of the window of every dose of a group that is not forced, counted as Python integers which do not
+    # overflow on huge windows
+    multiplicity = presolved.multiplicity.tolist()
+    first = presolved.first.tolist()
+    last = presolved.last.tolist()
+    forced = presolved.forced.tolist()
+    timeslots = [sum(max(0, end - start + 1) * count for start, end, count, isForced in zip(first[dose], last[dose], multiplicity, forced[dose])
+                     if not isForced) for dose in (0, 1)]
+    return timeslots[0] * (p1 + 3) + timeslots[1] * (p2 + 3)
+
+def runSolver(solver, result, phase="build", deadline=None):
+    """Solves the model that was built since the bounds were computed, and stores the status and the proven bound in result. phase is
+    the name of the phase that ends when the solver starts. The solver gets the time that is left until deadline, a perf_counter time.
+
+    Returns whether there is a solution to read.
+    """
+    profiler = result["profile"]
+    profiler.model["variables"] = solver.NumVariables()
+    profiler.model["constraints"] = solver.NumConstraints()
+    profiler.lap(phase)
+    if deadline is not None:
+        solver.SetTimeLimit(max(1, int((deadline - perf_counter()) * 1000)))
+    status = solver.Solve()
+    profiler.search.update({"iterations": solver.iterations(), "nodes": solver.nodes(), "wallTime": solver.wall_time() / 1000})
+    profiler.lap("solve")
+    if status == solver.INFEASIBLE:
+        result["status"] = INFEASIBLE
+        return False
+    if status not in (solver.OPTIMAL, solver.FEASIBLE):
+        result["status"] = TIMEOUT
+        return False
+    result["status"] = OPTIMAL if status == solver.OPTIMAL else FEASIBLE
+    # The bound of the solver is fractional, any integer number of machines is at least its ceiling
+    result["bound"] = math.ceil(solver.Objective().BestBound() - 1e-6)
+    return True
+
+def solveSparse(solver, programInput, result, heuristicSchedule=None, modelCache=None, stored=None, presolved=None, deadline=None):
+    """Solves the time-indexed formulation without machine index, with variables only inside the feasible windows of the patients.
+
+    The model is built over the groups of identical patients of presolved, the result of presolve: a group of k patients has integer
+    variables that count how many of its doses are taken on every timeslot. Doses whose time is forced get no variables, they are a
+    constant number of occupied hospitals on their timeslots. heuristicSchedule can hold a feasible Schedule, that is given to SCIP as a
+    starting solution when its number of hospitals fits in the domain of M. The model is stored in modelCache when it is not None,
+    stored can hold the (modelPath, sidecar) of a stored model to load instead. The solver stops at deadline, a perf_counter time.
+    """
+    presolved = presolve(programInput) if presolved is None else presolved
+    if stored is not None:
+        dose1, dose2 = loadSparse(solver, presolved, *stored)
+        solved = runSolver(solver, result, "load", deadline)
+    else:
+        dose1, dose2 = buildSparse(solver, programInput, presolved, result, heuristicSchedule)
+        if modelCache is not None:
+            result["profile"].lap("build")
+            storeSparse(solver, modelCache, programInput, presolved, dose1, dose2, heuristicSchedule, result["bounds"])
+        solved = runSolver(solver, result, "build" if modelCache is None else "store", deadline)
+    if not solved:
+        return Schedule.noSolution(**result)
+
+    # Read the chosen timeslots of the doses of every group, the hospitals follow from colouring the dose intervals
+    groupTimes = []
+    for group, multiplicity in enumerate(presolved.multiplicity.tolist()):
+        groupTimes.append([doseTimes(doses[group], int(presolved.first[dose][group]), multiplicity)
+                           for dose, doses in enumerate((dose1, dose2))])
+    lines, machines = assignHospitals(programInput, expandTimes(presolved, groupTimes))
+    result["profile"].lap("extract")
+    return Schedule.fromLines(lines, machines, **result)
+
+def doseTimes(doses, forcedTime, multiplicity):
+    """Returns the times of the doses of a group in the solution, doses holds its (timeslot, variable) pairs or None when forced."""
+    if doses is None:
+        return [forcedTime] * multiplicity
+    return [t for t, variable in doses for dose in range(round(variable.solution_value()))]
+
+def buildSparse(solver, programInput, presolved, result, heuristicSchedule=None):
+    """Builds the sparse model of the Presolved groups in solver, hinted with heuristicSchedule. Returns (dose1, dose2), per group the
+    (timeslot, variable) pairs of its first resp. second doses, None when the time of the dose is forced."""
+    lowerBound, upperBound = result["bounds"]
+    groups = presolved.groups
+    p1 = programInput.p1
+    p2 = programInput.p2
+    multiplicity = presolved.multiplicity.tolist()
+    first = presolved.first.tolist()
+    last = presolved.last.tolist()
+    forced = presolved.forced.tolist()
+    numGroups = len(multiplicity)
+
+    # [variables]
+    # y_gt: number of patients of group g that take their first dose on timeslot t, only for t in [first[0], last[0]]
+    # z_gt: number of patients of group g that take their second dose on timeslot t, only for t in [first[1], last[1]]
+    # M   : Maximal number of concurrent doses over all timeslots, which equals the number of machines needed
+    # A group of a single patient has binary y and z, as every patient had before grouping.
+    M = solver.IntVar(lowerBound, upperBound, "M")
+
+    dose1 = [None] * numGroups # dose1[group] holds the (timeslot, y_gt) pairs of the group
+    dose2 = [None] * numGroups # dose2[group] holds the (timeslot, z_gt) pairs of the group
+    # occupying[t] holds all variables of doses that are still in the hospital on timeslot t when they are set
+    occupying = {}
+    # startTimes holds all timeslots on which a dose that is not forced can start
+    startTimes = set()
+
+    for group in range(numGroups):
+        count = multiplicity[group]
+        for dose, doses, name, length in ((0, dose1, "y", p1), (1, dose2, "z", p2)):
+            if forced[dose][group]:
+                continue
+            times = range(first[dose][group], last[dose][group] + 1)
+            startTimes.update(times)
+            doses[group] = [(t, solver.BoolVar(f"{name}(group:{group}, time:{t})") if count == 1 else
+                             solver.IntVar(0, count, f"{name}(group:{group}, time:{t})")) for t in times]
+            # Every patient of the group takes the dose exactly once: SUM y_gt = k and SUM z_gt = k
+            constraintAllDoses = solver.Constraint(count, count)
+            for t, variable in doses[group]:
+                constraintAllDoses.SetCoefficient(variable, 1)
+                for time in range(t, t + length):
+                    occupying.setdefault(time, []).append(variable)
+
+        # After a forced first dose, every time in the tightened window of the second dose meets the gap constraint
+        if dose1[group] is None or dose2[group] is None:
+            continue
+        patient = groups.patients[group]
+        shift = p1 + programInput.gap + patient.x
+        if count == 1:
+            # S - T ∈ [p1 + gap + x, p1 + gap + x + l - p2], with T = SUM y_gt*t and S = SUM z_gt*t
+            constraintFeasibleScheduleS = solver.Constraint(shift, shift + patient.l - p2)
+            for t, yg in dose1[group]:
+                constraintFeasibleScheduleS.SetCoefficient(yg, -t)
+            for t, zg in dose2[group]:
+                constraintFeasibleScheduleS.SetCoefficient(zg, t)
+        else:
+            addPairing(solver, group, dose1[group], dose2[group], shift, patient.l - p2, count)
+
+    # FORALL t: SUM y_gt' + SUM z_gt' - M <= -forcedCount[t], over all doses that are in the hospital on timeslot t. Timeslots with only
+    # forced doses need no constraint, the forced doses are mandatory parts which the lower bound of M already covers.
+    forcedStarts = [np.repeat(presolved.first[dose][presolved.forced[dose]], presolved.multiplicity[presolved.forced[dose]]) for dose in (0, 1)]
+    forcedStarts, forcedEnds = np.concatenate(forcedStarts), np.concatenate([forcedStarts[0] + p1, forcedStarts[1] + p2])
+    times = np.fromiter(occupying, dtype=np.int64, count=len(occupying))
+    forcedCount = occupancy(forcedStarts, forcedEnds, times)
+    # Only the event points of the timeline need a constraint. On a timeslot where no dose can start and no forced dose starts, the
+    # doses in the hospital are a subset of the ones of the timeslot before, so its constraint follows from the one before.
+    events = (~np.isin(times - 1, times) | np.isin(times, np.fromiter(startTimes, dtype=np.int64, count=len(startTimes)))
+              | (forcedCount > occupancy(forcedStarts, forcedEnds, times - 1)))
+    for time, count in zip(times[events].tolist(), forcedCount[events].tolist()):
+        constraint = solver.Constraint(-solver.infinity(), -count)
+        for variable in occupying[time]:
+            constraint.SetCoefficient(variable, 1)
+        constraint.SetCoefficient(M, -1)
+    result["stats"]["timeslots"] = len(times)
+    result["stats"]["event points"] = int(events.sum())
+
+    # Minimize M (number of machines)
+    solver.Minimize(M)
+
+    # The heuristic can only be hinted when its number of hospitals fits in the domain of M
+    if heuristicSchedule is not None and heuristicSchedule.machines <= upperBound:
+        # Hint the number of patients of every group that the heuristic gives a dose on every timeslot
+        hintVariables = [M]
+        hintValues = [upperBound]
+        for jobs, doses1, doses2 in zip(presolved.members, dose1, dose2):
+            for doses, times in ((doses1, heuristicSchedule.T1[jobs].tolist()), (doses2, heuristicSchedule.T2[jobs].tolist())):
+                for t, variable in doses or []:
+                    hintVariables.append(variable)
+                    hintValues.append(times.count(t))
+        solver.SetHint(hintVariables, hintValues)
+    return dose1, dose2
+
+def addPairing(solver, group, dose1, dose2, shift, slack, count):
+    """Adds the gap constraint of a group of count identical patients, on the numbers of doses per timeslot.
+
+    The times of the doses can be paired up into patients, when the i-th earliest second dose is in [T + shift, T + shift + slack] of the
+    i-th earliest first dose T. With A(t) and B(t) the numbers of first resp. second doses up to t, that holds when for every t:
+    B(t + shift) <= A(t) and A(t) <= B(t + shift + slack). The numbers up to every timeslot are variables of their own.
+    """
+    prefix1 = prefixSums(solver, dose1, count, f"Y(group:{group}")
+    prefix2 = prefixSums(solver, dose2, count, f"Z(group:{group}")
+    first2 = dose2[0][0]
+
+    def doses2Until(t):
+        # Before the window no dose is taken, from the last timeslot of the window on all doses are
+        return 0 if t < first2 else prefix2.get(t, count)
+
+    for t, variable in dose1[:-1]:
+        for smaller, larger in ((doses2Until(t + shift), prefix1[t]), (prefix1[t], doses2Until(t + shift + slack))):
+            # smaller - larger <= 0, where either side may be a constant
+            constraint = solver.Constraint(-solver.infinity(), (larger if isinstance(larger, int) else 0) - (smaller if isinstance(smaller, int) else 0))
+            if not isinstance(smaller, int):
+                constraint.SetCoefficient(smaller, 1)
+            if not isinstance(larger, int):
+                constraint.SetCoefficient(larger, -1)
+
+def prefixSums(solver, doses, count, name):
+    """Returns variables that hold the number of doses on or before every timeslot of the window but the last, by timeslot."""
+    prefix = {}
+    previous = None
+    for t, variable in doses[:-1]:
+        total = solver.IntVar(0, count, f"{name}, time:{t})")
+        # total_t = total_(t-1) + dose_t
+        constraint = solver.Constraint(0, 0)
+        constraint.SetCoefficient(total, 1)
+        constraint.SetCoefficient(variable, -1)
+        if previous is not None:
+            constraint.SetCoefficient(previous, -1)
+        prefix[t] = total
+        previous = total
+    return prefix
+
+def storeSparse(solver, modelCache, programInput, presolved, dose1, dose2, heuristicSchedule, bounds):
+    """Stores the sparse model in modelCache, as a protocol buffer to load it again and as an MPS file for standalone solvers. The
+    sidecar holds per patient the index of the first y and z variable of its group, -1 for a forced dose, and the heuristic schedule and
+    the bounds."""
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+
+    def writeProto(path):
+        with open(path, "wb") as fd:
+            fd.write(proto.SerializeToString())
+
+    def writeMps(path):
+        with open(path, "w") as fd:
+            fd.write(solver.ExportModelAsMpsFormat(False, False))
+
+    columns = {"dose1": np.full(len(programInput.patients), -1, dtype=np.int64), "dose2": np.full(len(programInput.patients), -1, dtype=np.int64),
+               "T1": heuristicSchedule.T1, "M1": heuristicSchedule.M1, "T2": heuristicSchedule.T2, "M2": heuristicSchedule.M2}
+    for jobs, doses1, doses2 in zip(presolved.members, dose1, dose2):
+        for column, doses in (("dose1", doses1), ("dose2", doses2)):
+            if doses is not None:
+                columns[column][jobs] = doses[0][1].index()
+    sidecar = {"machines": heuristicSchedule.machines, "bounds": list(bounds), "columns": columns}
+    modelCache.save(programInput, "sparse", {"pb": writeProto, "mps": writeMps}, sidecar)
+
+def loadSparse(solver, presolved, modelPath, sidecar):
+    """Loads a sparse model stored by storeSparse into solver, returns (dose1, dose2) like buildSparse."""
+    proto = linear_solver_pb2.MPModelProto()
+    with open(modelPath, "rb") as fd:
+        proto.ParseFromString(fd.read())
+    error = solver.LoadModelFromProto(proto)
+    if error:
+        raise ValueError(f"Stored model {modelPath} can not be loaded: {error}")
+    # The variables of the doses of a group are consecutive, one for every timeslot of its window
+    variables = solver.variables()
+    doses = ([], [])
+    for group, jobs in enumerate(presolved.members):
+        for dose, column in enumerate(("dose1", "dose2")):
+            start = int(sidecar["columns"][column][jobs[0]])
+            first = int(presolved.first[dose][group])
+            doses[dose].append(None if start < 0 else
+                               [(t, variables[start + t - first]) for t in range(first, int(presolved.last[dose][group]) + 1)])
+    return doses
+
+def solveDense(solver, programInput, result, deadline=None):
+    """Solves the formulation of the paper, with a variable for every job x timeslot x machine. The solver stops at deadline, a
+    perf_counter time."""
+    lowerBound, upperBound = result["bounds"]
     # Basic variables
     patients = programInput.patients
-    machineUpperBound = len(patients) + 1
+    machineUpperBound = upperBound + 1
     highestMachineNumber = machineUpperBound - 1
     numTimeslotsDose1 = programInput.maxtime[0] - programInput.mintime[0] + 1
     numTimeslotsDose2 = programInput.maxtime[1] - programInput.mintime[1] + 1
@@ -79,7 +406,7 @@ def SolveILP(programInput):
     # M    : Maximal number of concurrent machines over all timeslots
 
     # M: total number of machines
-    M = solver.IntVar(0, len(patients), "M")
+    M = solver.IntVar(lowerBound, upperBound, "M")
 
     # Initialise arrays that holds variables of dose 1 and dose 2
     dose1 = [None] * len(patients) #Holds all y variables
@@ -205,16 +532,12 @@ def SolveILP(programInput):
     # please use the –verify_solution flag to gain confidence about the numerical stability of your solution.
     # For this reason, instead of reading objective.value, we the value of the variable itself read.
 
-    # Set time limit to 30 minutes
-    solver.SetTimeLimit(1800000)
-
-    # Solve the problem and print the solution.
-    result = solver.Solve()
-    if result is not solver.OPTIMAL:
-        print("Could not find solution.")
-        return "-"
+    # Solve the problem and read the solution.
+    if not runSolver(solver, result, deadline=deadline):
+        return Schedule.noSolution(**result)
 
-    # For each patient, get their T and S value and print it out
+    # For each patient, get their T and S value and put it in the schedule
+    lines = []
     for job in range (0, len(patients)):
         timeFirstDose = int(Ts[job].solution_value())
         timeSecondDose = int(Ses[job].solution_value())
@@ -222,10 +545,44 @@ def SolveILP(programInput):
         machineFirstDose = int(m[0][job].solution_value())
         machineSecondDose = int(m[1][job].solution_value())
 
-        print(f"{timeFirstDose}, {machineFirstDose}, {timeSecondDose}, {machineSecondDose}")
+        lines.append([timeFirstDose, machineFirstDose, timeSecondDose, machineSecondDose])
 
-    print(int(M.solution_value()))
-    return "S"
+    result["profile"].lap("extract")
+    return Schedule.fromLines(lines, int(M.solution_value()), **result)
 
 if __name__ == "__main__":
-    SolveILP(parseInput())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--formulation", choices=FORMULATIONS, default="sparse", help="model to solve the input with")
+    parser.add_argument("--decompose", action="store_true", help="solve independent groups of patients in parallel")
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit of the solver in seconds, the best schedule found by then is output")
+    parser.add_argument("--anytime", action="store_true", help="report the heuristic and the final schedule on stderr while solving")
+    parser.add_argument("--incumbent", help="file to write every improving schedule to while solving")
+    parser.add_argument("--cache", help="directory of the solution cache, inputs that were solved before are not solved again")
+    parser.add_argument("--cache-size", type=float, default=1024, help="size of the solution cache in MB")
+    parser.add_argument("--max-coefficients", type=int, default=MAX_COEFFICIENTS,
+                        help="largest model to build, in coefficients, the heuristic schedule is output for larger models")
+    parser.add_argument("--model-cache", help="directory to store the built sparse models in, the model of an input that was solved before is loaded")
+    parser.add_argument("--profile", help="json file to write the time, memory, model size and search statistics of every phase to")
+    parser.add_argument("--trace", help="file to write the phases and solutions to, in the trace event format of chrome://tracing")
+    args = parser.parse_args()
+
+    profiler = Profiler()
+
+    onSolution = anytimeReporter(args.incumbent) if args.anytime or args.incumbent else None
+    cache = SolutionCache(args.cache, int(args.cache_size * 1024 * 1024)) if args.cache else None
+    modelCache = ModelCache(args.model_cache) if args.model_cache else None
+    programInput = parseInput()
+    profiler.lap("parse")
+    schedule = solveCached(cache, programInput, f"OfflineLS {args.formulation}",
+                           lambda programInput: SolveILP(programInput, args.formulation, args.decompose, args.time_limit, onSolution, profiler,
+                                                         modelCache, args.max_coefficients))
+    if cache is not None:
+        profiler.lap("cache")
+    writeSchedule(schedule)
+    profiler.lap("output")
+    print(schedule.summary(), file=sys.stderr)
+    if args.profile:
+        profiler.writeRecord(args.profile)
+        print(profiler.summary(), file=sys.stderr)
+    if args.trace:
+        profiler.writeTrace(args.trace)
\ No newline at end of file
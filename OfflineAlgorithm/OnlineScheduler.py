@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+"""Online algorithm of the Federal Vaccination Agency: schedules every patient as soon as it arrives, without knowing the patients that
+come after it. Reads the format of TestInstances/Online: p1, p2 and gap, followed by one "r, d, x, l" line per patient and a line "x"."""
+from Instance import Patient
+import argparse
+import random
+import sys
+
+
+class Gap:
+    """A free gap [start, end) of a hospital, as a node of the treap of FreeTime
+
+    Every node also keeps the highest end and the longest gap in its subtree, which guide the searches down the tree.
+    """
+    __slots__ = ("start", "end", "hospital", "priority", "left", "right", "maxEnd", "maxLength")
+
+    def __init__(self, start, end, hospital, priority):
+        self.start = start
+        self.end = end
+        self.hospital = hospital
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.update()
+
+    def key(self):
+        return (self.start, self.hospital)
+
+    def update(self):
+        self.maxEnd = self.end
+        self.maxLength = self.end - self.start
+        for child in (self.left, self.right):
+            if child is not None:
+                self.maxEnd = max(self.maxEnd, child.maxEnd)
+                self.maxLength = max(self.maxLength, child.maxLength)
+
+def split(node, key):
+    """Splits the treap into the gaps with a key below key and the others."""
+    if node is None:
+        return None, None
+    if node.key() < key:
+        node.right, right = split(node.right, key)
+        node.update()
+        return node, right
+    left, node.left = split(node.left, key)
+    node.update()
+    return left, node
+
+def merge(left, right):
+    """Merges two treaps, all keys of left are below the keys of right."""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = merge(left.right, right)
+        left.update()
+        return left
+    right.left = merge(left, right.left)
+    right.update()
+    return right
+
+class FreeTime:
+    """Free time of all hospitals together, as a single index of their free gaps [start, end)
+
+    The gaps are the nodes of a treap by (start, hospital), in which every subtree knows its highest end and its longest gap. Finding the
+    earliest start of a dose on any hospital is then a walk down the tree, however many hospitals and bookings there are.
+    """
+    def __init__(self, seed=0):
+        self.root = None
+        self.random = random.Random(seed)
+
+    def addGap(self, start, end, hospital):
+        left, right = split(self.root, (start, hospital))
+        self.root = merge(merge(left, Gap(start, end, hospital, self.random.random())), right)
+
+    def removeGap(self, gap):
+        left, right = split(self.root, gap.key())
+        middle, right = split(right, (gap.start, gap.hospital + 1))
+        self.root = merge(left, right)
+
+    def openHospital(self, hospital):
+        self.addGap(0, float("inf"), hospital)
+
+    def earliestStart(self, earliest, latest, length):
+        """Returns (start, gap): the earliest start in [earliest, latest] at which a hospital is free for length timeslots and the gap of
+        that hospital that holds the dose, or None."""
+        candidates = self.candidates(earliest, latest, length)
+        return candidates[0] if candidates else None
+
+    def candidates(self, earliest, latest, length):
+        """Returns up to two (start, gap) of a dose in [earliest, latest]: the earliest start, and the start of the first gap after
+        earliest that holds the dose, which leaves no free piece before it."""
+        candidates = []
+        for gap in (self.covering(self.root, earliest, earliest + length), self.firstLongGap(self.root, earliest, length)):
+            if gap is None or max(earliest, gap.start) > latest:
+                continue
+            start = max(earliest, gap.start)
+            candidates.append((start, gap))
+            # The start against the booking at the end of the gap
+            if gap.end != float("inf") and min(latest, gap.end - length) > start:
+                candidates.append((min(latest, gap.end - length), gap))
+        return candidates
+
+    def covering(self, node, time, end):
+        """Returns the gap that starts last on or before time, of the gaps that end on or after end, or None. A dose at time in that gap
+        leaves the shortest free piece before it."""
+        if node is None or node.maxEnd < end:
+            return None
+        if node.start > time:
+            return self.covering(node.left, time, end)
+        gap = self.covering(node.right, time, end)
+        if gap is not None:
+            return gap
+        if node.end >= end:
+            return node
+        # All gaps of the left subtree start before time
+        return self.covering(node.left, time, end)
+
+    def firstLongGap(self, node, time, length):
+        """Returns the first gap that starts after time and holds at least length timeslots, or None."""
+        if node is None or node.maxLength < length:
+            return None
+        if node.start <= time:
+            return self.firstLongGap(node.right, time, length)
+        gap = self.firstLongGap(node.left, time, length)
+        if gap is not None:
+            return gap
+        if node.end - node.start >= length:
+            return node
+        return self.firstLongGap(node.right, time, length)
+
+    def book(self, gap, start, length):
+        """Books [start, start + length) in the gap, and splits the gap around it."""
+        self.removeGap(gap)
+        if gap.start < start:
+            self.addGap(gap.start, start, gap.hospital)
+        if start + length < gap.end:
+            self.addGap(start + length, gap.end, gap.hospital)
+
+class OnlineScheduler:
+    """Schedules patients one by one on the hospitals opened so far, and opens a new hospital when a patient does not fit"""
+    def __init__(self, p1, p2, gap):
+        self.p1 = p1
+        self.p2 = p2
+        self.gap = gap
+        self.hospitals = 0
+        self.freeTime = FreeTime()
+
+    def fragments(self, start, length, gap):
+        """Returns the number of free pieces next to a dose at start in the gap that become too short for any dose."""
+        shortest = min(self.p1, self.p2)
+        return (0 < start - gap.start < shortest) + (0 < gap.end - (start + length) < shortest)
+
+    def place(self, patient):
+        """Returns the best ((T1, gap 1), (T2, gap 2)) of the patient on the current hospitals, or None when it does not fit.
+
+        The candidates of both doses are the earliest start, and the start of the first free gap after it that is long enough. Of the
+        pairs of candidates that meet the interval of the patient, the one that leaves the fewest free pieces too short for any dose is
+        chosen, then the one on the lowest hospitals, then the earliest one. When no pair does, the first dose is taken at the earliest
+        time any hospital is free and the second dose at the earliest time after it. When that is too late for the interval of the
+        patient, no first dose before T2 - shift - (l - p2) has a second dose either, so the first dose is searched again from there.
+        Every search is a walk down the index of free gaps.
+        """
+        shift = self.p1 + self.gap + patient.x
+        slack = patient.l - self.p2
+        best = None
+        for T1, gap1 in self.freeTime.candidates(patient.firstPossible[0], patient.lastPossible[0], self.p1):
+            for T2, gap2 in self.freeTime.candidates(T1 + shift, T1 + shift + slack, self.p2):
+                key = (self.fragments(T1, self.p1, gap1) + self.fragments(T2, self.p2, gap2), max(gap1.hospital, gap2.hospital), T1, T2)
+                if best is None or key < best[0]:
+                    best = (key, (T1, gap1), (T2, gap2))
+        if best is not None:
+            return best[1], best[2]
+
+        earliest = patient.firstPossible[0]
+        while True:
+            dose1 = self.freeTime.earliestStart(earliest, patient.lastPossible[0], self.p1)
+            if dose1 is None:
+                return None
+            dose2 = self.freeTime.earliestStart(dose1[0] + shift, float("inf"), self.p2)
+            if dose2 is None:
+                return None
+            if dose2[0] <= dose1[0] + shift + slack:
+                return dose1, dose2
+            earliest = dose2[0] - shift - slack
+
+    def schedule(self, r, d, x, l):
+        """Schedules the patient that just arrived, returns its [T1, M1, T2, M2] line.
+
+        Raises ValueError when the patient can not be scheduled at all: when its window is shorter than p1, or l < p2.
+        """
+        if d - r + 1 < self.p1 or l < self.p2:
+            raise ValueError(f"patient {r}, {d}, {x}, {l} can not be scheduled, it needs d - r + 1 >= p1 and l >= p2")
+        patient = Patient(r, d, x, l, self.p1, self.p2, self.gap)
+        placement = self.place(patient)
+        if placement is None:
+            # The patient does not fit in the existing hospitals, open a new one: both doses fit as early as possible on an empty hospital
+            self.freeTime.openHospital(self.hospitals)
+            self.hospitals += 1
+            placement = self.place(patient)
+        (T1, gap1), (T2, gap2) = placement
+        self.freeTime.book(gap1, T1, self.p1)
+        # Booking the first dose can split the gap of the second dose, which is still free from T2 on
+        T2, gap2 = self.freeTime.earliestStart(T2, T2, self.p2)
+        self.freeTime.book(gap2, T2, self.p2)
+        return [T1, gap1.hospital + 1, T2, gap2.hospital + 1]
+
+def runOnline(inputStream, out):
+    """Reads the online input from inputStream and writes the line of every patient to out as soon as it is scheduled, followed by the
+    number of hospitals. Returns the number of hospitals."""
+    p1, p2, gap = (int(inputStream.readline()) for value in range(3))
+    scheduler = OnlineScheduler(p1, p2, gap)
+    for line in inputStream:
+        line = line.strip()
+        if line == "x":
+            break
+        if not line:
+            continue
+        r, d, x, l = (int(value) for value in line.split(","))
+        try:
+            T1, M1, T2, M2 = scheduler.schedule(r, d, x, l)
+        except ValueError as error:
+            # An infeasible patient gets a line that says so, the other patients are still scheduled
+            out.write(f"Could not schedule the patient: {error}\n")
+            out.flush()
+            continue
+        out.write(f"{T1}, {M1}, {T2}, {M2}\n")
+        out.flush()
+    out.write(f"{scheduler.hospitals}\n")
+    return scheduler.hospitals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+    runOnline(sys.stdin, sys.stdout)
@@ -3,118 +3,214 @@
 """Performance checker for Offline*.py, the programs by the Federal Vaccination Agency to schedule vaccinations."""
 import OfflineLS as offlineILP
 import OfflineCPSAT as offlineCPSAT
-import sys
+import RollingHorizon as rollingHorizon
+import Bisection as bisection
+import LargeNeighbourhood as largeNeighbourhood
+from Instance import loadInstance
+from SolverOptions import SolverOptions
+from Schedule import OPTIMAL
+import argparse
+import json
 import os
-from time import perf_counter
+from time import perf_counter, sleep
 import multiprocessing as mp
 import pandas as pd
 import re
 
+# Solvers that can be benchmarked, by name: the solver module and the formulation it uses
+SOLVERS = {
+    "cpsat": (offlineCPSAT, "nooverlap2d"),
+    "cpsat-cumulative": (offlineCPSAT, "cumulative"),
+    "cpsat-symmetry": (offlineCPSAT, "nooverlap2d"),
+    "ls": (offlineILP, "sparse"),
+    "ls-dense": (offlineILP, "dense"),
+    "rolling": (rollingHorizon, "nooverlap2d"),
+    "bisection": (bisection, "nooverlap2d"),
+    "bisection-cumulative": (bisection, "cumulative"),
+    "lns": (largeNeighbourhood, "nooverlap2d"),
+}
+# SolverOptions of the solvers that do not use the defaults
+SOLVER_OPTIONS = {
+    "cpsat-symmetry": {"symmetry": True},
+}
+
+def solverArguments(solverName, workers, options=None):
+    """Returns the keyword arguments of SolveILP for the solver with the given name: the SolverOptions with workers for the solvers
+    that use CP-SAT. options can hold SolverOptions values by name, that replace the defaults of the solver."""
+    module, formulation = SOLVERS[solverName]
+    if module not in (offlineCPSAT, rollingHorizon, bisection, largeNeighbourhood):
+        return {}
+    return {"options": SolverOptions(workers, **{**SOLVER_OPTIONS.get(solverName, {}), **(options or {})})}
+
 # This function is from: https://stackoverflow.com/questions/4813061/non-alphanumeric-list-order-from-os-listdir
 # Sorting based on alphabetical and numerical values
 def sorted_alphanumeric(data):
     convert = lambda text: int(text) if text.isdigit() else text.lower()
-    alphanum_key = lambda key: [ convert(c) for c in re.split("([0-9]+)", key) ] 
+    alphanum_key = lambda key: [ convert(c) for c in re.split("([0-9]+)", key) ]
     return sorted(data, key=alphanum_key)
 
-def evaluateFileOld(programInput, avgTime, result):
-    evaluateFile(offlineILP, programInput, avgTime, result)
-
-def evaluateFileNew(programInput, avgTime, result):
-    evaluateFile(offlineCPSAT, programInput, avgTime, result)
-
-def evaluateFile(module, programInput, avgTime, result):
-    oldOut = sys.stdout
-
-    times = []
-
-    # Run the solvers a given amount of times on the input, store total time they took
-    fd = open(os.devnull, "w")
-    sys.stdout = fd
-    for i in range(0, 1):
-        start = perf_counter()
-        result.value = module.SolveILP(programInput)
-        end = perf_counter()
-        times.append(end - start)
-
-    fd.close()
-    sys.stdout = oldOut
-
-    # Print statistics
-    avgTime.value = sum(times) / len(times)
-
-if __name__ == "__main__":
-    testInstanceDir = "../TestInstances/Offline"
-    filenames = sorted_alphanumeric(os.listdir(testInstanceDir))
-
-    # Initialise the table
-    df = pd.DataFrame()
-
-    for file in filenames:
-        print(f"==========={file}==========")
-        oldIn = sys.stdin
-        oldOut = sys.stdout
-        
-        if (file == "1000000.txt"):
-            continue
-
-        # Start by reading and parsing the file
-        fin = open(f"{testInstanceDir}/{file}", "r")
-        sys.stdin = fin
-        programInput = offlineCPSAT.parseInput()
-        fin.close()
-        sys.stdin = oldIn
-
-        avgTime = mp.Value("d", -1, lock=False)
-        result = mp.Value("u", "?", lock=False)
-        avgTimeVarOld = mp.Value("d", -1, lock=False)
-        resultVarOld = mp.Value("u", "?", lock=False)
-        p=mp.Process(target = evaluateFileNew, args = (programInput, avgTime, result))
-        p.start()
-        
-        # Time limit for preprocessing of the data, set to 30 minutes
-        p.join(60)
-
-        print("New (CP-SAT) algorithm:")
-        if p.is_alive():
-            print("Took to long...")
-            p.kill()
-            p.join()
-            resultNew = "?"
-            CPSAT = "X"
-        else: 
-            avgNew = avgTime.value
-            resultNew = result.value
-            print(resultNew)
-            print(f"Avg: {avgNew}")
-            CPSAT = round(avgNew, 3)
-
-        p=mp.Process(target = evaluateFileOld, args = (programInput, avgTimeVarOld, resultVarOld))
-        p.start()
-
-        p.join(60)
-
-        print("Old (ILP) algorithm:")
-        if p.is_alive():
-            print("Took to long...")
-            p.kill()
-            p.join()
-            resultOld = "?"
-            LS = "X"
-        else:
-            avgOld = avgTimeVarOld.value
-            resultOld = resultVarOld.value
-            print(resultOld)
-            print(f"Avg: {avgOld}")
-            LS = round(avgOld,3)
-        if resultOld == resultNew == "S":
-            speedup = round(avgOld / avgNew, 3)
-            print(f"On average, new one was {avgOld / avgNew} times faster than old one\n\n\n")
-        else: 
-            speedup = "-"
+def evaluateFile(path, solverName, timeLimit, workers, connection):
+    """Runs a single solver once on the instance at path, and sends the result over the connection. Runs in its own process."""
+    module, formulation = SOLVERS[solverName]
+    # Every run reads the file itself, so the parent does not have to pickle the input for every process
+    programInput = loadInstance(path)
+    # The runs that are executed at the same time share the cores
+    arguments = solverArguments(solverName, workers)
+    start = perf_counter()
+    schedule = module.SolveILP(programInput, formulation, timeLimit=timeLimit, **arguments)
+    end = perf_counter()
+    # The wall-clock time of every phase and the peak memory, to see which part of the solver a change in time comes from
+    profile = {} if schedule.profile is None else schedule.profile.record()
+    connection.send({"status": schedule.status, "machines": schedule.machines, "bound": schedule.bound, "time": end - start,
+                     "phases": dict(schedule.phases), "peakMemory": profile.get("peakMemory"), "model": profile.get("model"),
+                     "search": profile.get("search")})
+    connection.close()
+
+class Run:
+    """A single run of a solver on an instance, executed in its own process"""
+    def __init__(self, file, path, solverName, repeat):
+        self.file = file
+        self.path = path
+        self.solverName = solverName
+        self.repeat = repeat
+        self.process = None
+        self.connection = None
+        self.deadline = None
+        self.result = None
+
+    def start(self, timeLimit, grace, workers):
+        self.connection, childConnection = mp.Pipe(duplex=False)
+        self.process = mp.Process(target=evaluateFile, args=(self.path, self.solverName, timeLimit, workers, childConnection))
+        self.process.start()
+        childConnection.close()
+        # The solver stops itself at its time limit, the process is only killed when it does not
+        self.deadline = perf_counter() + timeLimit + grace
+
+    def poll(self):
+        """Returns whether the run is done, kills the process when it passed its deadline."""
+        if self.connection.poll():
+            try:
+                self.result = self.connection.recv()
+            except EOFError:
+                self.result = {"status": "error", "machines": None, "bound": None, "time": None}
+        elif self.process.is_alive() and perf_counter() < self.deadline:
+            return False
+        elif self.process.is_alive():
+            self.process.kill()
+            self.result = {"status": "killed", "machines": None, "bound": None, "time": None}
+        elif self.result is None:
+            # The process ended without sending a result, for instance because the solver raised an exception
+            self.result = {"status": "error", "machines": None, "bound": None, "time": None}
+        self.process.join()
+        self.connection.close()
+        return True
+
+    def record(self):
+        return {"file": self.file, "solver": self.solverName, "repeat": self.repeat, **self.result}
+
+def runBenchmark(instanceDir, files, solverNames, repeats, timeLimit, jobs, grace=10):
+    """Runs every solver repeats times on every file, with at most jobs runs at the same time. Returns one record per run."""
+    pending = [Run(file, os.path.join(instanceDir, file), solverName, repeat)
+               for file in files for solverName in solverNames for repeat in range(repeats)]
+    pending.reverse()
+    running = []
+    records = []
+    workers = max(1, (os.cpu_count() or 1) // jobs)
+    while pending or running:
+        while pending and len(running) < jobs:
+            run = pending.pop()
+            run.start(timeLimit, grace, workers)
+            running.append(run)
+
+        stillRunning = []
+        for run in running:
+            if run.poll():
+                record = run.record()
+                records.append(record)
+                print(f"{record['file']} {record['solver']} #{record['repeat']}: {record['status']}, {record['machines']} machines, {record['time']}")
+            else:
+                stillRunning.append(run)
+        running = stillRunning
+        sleep(0.01)
+    return records
+
+def summarise(records):
+    """Turns the runs into one row per file and solver, with the median and minimum time over the optimal runs, the median time of every
+    phase of the solver over the same runs, and the highest peak memory."""
+    runs = pd.DataFrame(records)
+    rows = []
+    for (file, solverName), group in runs.groupby(["file", "solver"], sort=False):
+        optimal = group[group["status"] == OPTIMAL]
+        row = {
+            "file": file,
+            "solver": solverName,
+            "runs": len(group),
+            "optimal": len(optimal),
+            "status": OPTIMAL if len(optimal) == len(group) else group["status"].mode()[0],
+            "machines": group["machines"].dropna().min() if group["machines"].notna().any() else None,
+            "median": optimal["time"].median() if len(optimal) > 0 else None,
+            "min": optimal["time"].min() if len(optimal) > 0 else None,
+            "peakMemory": group["peakMemory"].max() if "peakMemory" in group else None,
+        }
+        # Runs that were killed or failed have no phases
+        phases = pd.DataFrame([phases for phases in optimal.get("phases", []) if isinstance(phases, dict)])
+        for name in phases.columns:
+            row[f"{name} median"] = phases[name].median()
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def latexTable(summary):
+    """Returns the LaTeX table of the paper, that compares the LS and CP-SAT times, for the files both solvers were ran on."""
+    table = pd.DataFrame()
+    for file, group in summary.groupby("file", sort=False):
+        times = {row.solver: row.median for row in group.itertuples()}
+        LS = "X" if times.get("ls") is None or pd.isna(times.get("ls")) else round(times["ls"], 3)
+        CPSAT = "X" if times.get("cpsat") is None or pd.isna(times.get("cpsat")) else round(times["cpsat"], 3)
+        speedup = round(LS / CPSAT, 3) if LS != "X" and CPSAT != "X" else "-"
         row = pd.DataFrame({"Filename": [file], "LS": [LS], "CP-SAT": [CPSAT], "LS/CP-SAT": [speedup]})
-        df = df.append(row, ignore_index=True)
+        table = pd.concat([table, row], ignore_index=True)
+    return table.to_latex(index=False)
+
+def compareWithBaseline(summary, baselinePath):
+    """Prints the speedup of every file and solver compared to the summary of an earlier run."""
+    with open(baselinePath, "r") as fd:
+        baseline = pd.DataFrame(json.load(fd)["summary"])
+    merged = summary.merge(baseline, on=["file", "solver"], suffixes=("", "Baseline"))
+    for row in merged.itertuples():
+        if pd.notna(row.median) and pd.notna(row.medianBaseline):
+            print(f"{row.file} {row.solver}: {row.medianBaseline:.3f}s -> {row.median:.3f}s ({row.medianBaseline / row.median:.2f}x)")
+        else:
+            print(f"{row.file} {row.solver}: {row.statusBaseline} -> {row.status}")
 
-    f = open("tableOffline.txt", "w")
-    f.write(df.to_latex(index=False))
-    f.close()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--instances", default="../TestInstances/Offline", help="directory with the instances to run")
+    parser.add_argument("--solvers", nargs="+", choices=list(SOLVERS), default=["cpsat", "ls"], help="solvers to run")
+    parser.add_argument("--time-limit", type=float, default=60, help="time limit per run in seconds")
+    parser.add_argument("--repeats", type=int, default=1, help="number of runs of every solver on every instance")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="number of runs at the same time")
+    parser.add_argument("--skip", nargs="*", default=["1000000.txt"], help="files to leave out")
+    parser.add_argument("--output", default="resultsOffline", help="prefix of the .csv and .json result files")
+    parser.add_argument("--baseline", help="json result file of an earlier run to compare the times with")
+    args = parser.parse_args()
+
+    filenames = [file for file in sorted_alphanumeric(os.listdir(args.instances)) if file not in args.skip]
+    records = runBenchmark(args.instances, filenames, args.solvers, args.repeats, args.time_limit, args.jobs)
+
+    # Sort the runs back into the order of the files and solvers, they finish in any order
+    fileOrder = {file: index for index, file in enumerate(filenames)}
+    records.sort(key=lambda record: (fileOrder[record["file"]], args.solvers.index(record["solver"]), record["repeat"]))
+    summary = summarise(records)
+
+    summary.to_csv(f"{args.output}.csv", index=False)
+    with open(f"{args.output}.json", "w") as fd:
+        json.dump({"timeLimit": args.time_limit, "repeats": args.repeats, "runs": records,
+                   "summary": json.loads(summary.to_json(orient="records"))}, fd, indent=1)
+
+    if args.baseline:
+        compareWithBaseline(summary, args.baseline)
+
+    if "ls" in args.solvers and "cpsat" in args.solvers:
+        f = open("tableOffline.txt", "w")
+        f.write(latexTable(summary))
+        f.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""Solver portfolio of the Federal Vaccination Agency. Which solver is fastest on an input is not known in advance, so several solvers
+of PerformCompare.py race on the same input, each in its own process. The race ends as soon as one of them proves its schedule optimal,
+or at the time limit with the best schedule of all of them, and the other solvers are killed."""
+from PerformCompare import SOLVERS, solverArguments
+from Schedule import Schedule, writeSchedule, anytimeReporter, OPTIMAL, FEASIBLE, INFEASIBLE, TIMEOUT
+from Instance import parseInput
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import sys
+from time import perf_counter
+
+# Solvers that race by default: both CP-SAT formulations and SCIP on the sparse model
+RACERS = ["cpsat", "cpsat-cumulative", "ls"]
+
+def portable(schedule):
+    """Returns a copy of the schedule without its Profiler, to send it to the process of the portfolio."""
+    return Schedule(schedule.T1, schedule.M1, schedule.T2, schedule.M2, schedule.machines, schedule.status, schedule.bound, schedule.bounds,
+                    dict(schedule.phases), dict(schedule.stats))
+
+def race(programInput, solverName, timeLimit, workers, messages):
+    """Runs a single solver of the portfolio, in its own process. Every improving schedule is put on messages as (solverName,
+    "solution", Schedule), the result as (solverName, "done", Schedule), and an exception as (solverName, "error", text)."""
+    module, formulation = SOLVERS[solverName]
+    try:
+        schedule = module.SolveILP(programInput, formulation, timeLimit=timeLimit,
+                                   onSolution=lambda schedule: messages.put((solverName, "solution", portable(schedule))),
+                                   **solverArguments(solverName, workers))
+        messages.put((solverName, "done", portable(schedule)))
+    except Exception as error:
+        messages.put((solverName, "error", f"{type(error).__name__}: {error}"))
+
+def solvePortfolio(programInput, solverNames=None, timeLimit=1800, workers=None, grace=10, onSolution=None):
+    """Races the solvers with the given names on the input, returns the Schedule of the winner.
+
+    Every solver gets timeLimit seconds, and the cores are shared by the solvers unless workers sets the number of CP-SAT workers of
+    every solver. The schedules of all solvers are combined: the best schedule of one solver and the best bound of another prove
+    optimality together, which ends the race as well. A solver that proves the input infeasible ends the race too. The solvers that
+    are still running are killed, and so is every solver that runs grace seconds past the time limit. onSolution is called with every
+    schedule that improves on the schedules of all solvers. The stats of the returned schedule hold the name of the solver it is from.
+    """
+    solverNames = RACERS if solverNames is None else solverNames
+    if len(programInput.patients) == 0:
+        return Schedule([], [], [], [], 0)
+    workers = workers or max(1, (os.cpu_count() or 1) // len(solverNames))
+    deadline = perf_counter() + timeLimit + grace
+    messages = mp.Queue()
+    processes = {solverName: mp.Process(target=race, args=(programInput, solverName, timeLimit, workers, messages))
+                 for solverName in solverNames}
+    for process in processes.values():
+        process.start()
+
+    best = None
+    bound = None
+    result = None
+    running = set(solverNames)
+    try:
+        while running and result is None:
+            try:
+                solverName, kind, content = messages.get(timeout=max(0, deadline - perf_counter()))
+            except queue.Empty:
+                break
+            if kind == "error":
+                print(f"{solverName} failed: {content}", file=sys.stderr)
+                running.discard(solverName)
+                continue
+            if kind == "done":
+                running.discard(solverName)
+                if content.status == INFEASIBLE:
+                    result = content
+            if content.bound is not None:
+                bound = content.bound if bound is None else max(bound, content.bound)
+            if content.hasSolution() and (best is None or content.machines < best.machines or content.status == OPTIMAL):
+                content.stats["winner"] = solverName
+                improving = best is None or content.machines < best.machines
+                best = content
+                if onSolution is not None and improving:
+                    onSolution(best)
+            if best is not None and (best.status == OPTIMAL or (bound is not None and bound >= best.machines)):
+                result = best
+    finally:
+        # The solvers that lost are killed, they do not stop on their own before their time limit
+        for process in processes.values():
+            if process.is_alive():
+                process.kill()
+            process.join()
+        messages.close()
+
+    if result is None:
+        if best is None:
+            return Schedule.noSolution(TIMEOUT, bound=bound)
+        result = best
+    if result.hasSolution():
+        result.bound = bound
+        result.status = OPTIMAL if bound is not None and bound >= result.machines else FEASIBLE
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--solvers", nargs="+", choices=list(SOLVERS), default=RACERS, help="solvers that race")
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit of every solver in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="number of CP-SAT workers per solver, the cores are shared by default")
+    parser.add_argument("--anytime", action="store_true", help="report every improving schedule of any solver on stderr")
+    parser.add_argument("--incumbent", help="file to write every improving schedule to while solving")
+    args = parser.parse_args()
+
+    programInput = parseInput()
+    onSolution = anytimeReporter(args.incumbent) if args.anytime or args.incumbent else None
+    schedule = solvePortfolio(programInput, args.solvers, args.time_limit, args.workers, onSolution=onSolution)
+    writeSchedule(schedule)
+    print(schedule.summary(), file=sys.stderr)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""Presolve of the inputs of the Federal Vaccination Agency, before a model is built. Patients with the same (r, d, x, l) are grouped
+into one entry with a multiplicity, doses whose window holds a single timeslot are marked as forced, and the windows are tightened with
+the gap constraint T2 in [T1 + p1 + gap + x, T1 + p1 + gap + x + l - p2]. A model over the groups is smaller, its solution is expanded
+back to a line per patient with expandTimes. An input whose times are all on a grid coarser than one timeslot is solved on that grid,
+with scaleInput and unscaleSchedule."""
+import math
+import numpy as np
+from Instance import ProgramInput
+from Schedule import Schedule
+
+class Presolved:
+    """The groups of identical patients of a ProgramInput
+
+    Attributes:
+        groups        ProgramInput with a single patient for every group
+        multiplicity  Array with the number of patients of every group
+        members       Per group, an array with the indices of its patients in the input
+        first, last   Arrays [dose 1, dose 2] with the tightened first and last possible time of the doses of every group
+        forced        Arrays [dose 1, dose 2] that hold for every group whether the time of the dose is forced
+        empty         Array that holds for every group whether one of its windows is empty or l < p2, which makes the input infeasible
+    """
+    def __init__(self, groups, multiplicity, members):
+        self.groups = groups
+        self.multiplicity = multiplicity
+        self.members = members
+        self.first, self.last = tightenWindows(groups)
+        self.forced = self.first == self.last
+        # A second dose that is longer than its interval l never fits, whatever the windows are
+        self.empty = (self.first > self.last).any(axis=0) | (groups.l < groups.p2)
+
+    def infeasible(self):
+        return bool(self.empty.any())
+
+def tightenWindows(programInput):
+    """Returns (first, last), the windows of both doses of every patient narrowed by the gap constraint, [dose 1, dose 2] arrays.
+
+    The first dose can only be taken where a second dose fits after it, and the other way around. The windows of a ProgramInput already
+    follow from each other, so for an input this only finds the windows that can not hold a dose at all.
+    """
+    shift = programInput.p1 + programInput.gap + programInput.x
+    slack = programInput.l - programInput.p2
+    first = programInput.firstPossible.copy()
+    last = programInput.lastPossible.copy()
+    # T1 in [first[1] - shift - slack, last[1] - shift] and T2 in [first[0] + shift, last[0] + shift + slack]
+    first[0] = np.maximum(first[0], first[1] - shift - slack)
+    last[0] = np.minimum(last[0], last[1] - shift)
+    first[1] = np.maximum(first[1], first[0] + shift)
+    last[1] = np.minimum(last[1], last[0] + shift + slack)
+    return first, last
+
+def presolve(programInput):
+    """Returns the Presolved groups of the input, in order of (r, d, x, l)."""
+    columns = (programInput.r, programInput.d, programInput.x, programInput.l)
+    numPatients = len(programInput.r)
+    if numPatients == 0 or any(column.dtype == object for column in columns):
+        # Numbers that do not fit in 64 bits can not be grouped by numpy, every patient is its own group
+        return Presolved(programInput, np.ones(numPatients, dtype=np.int64), [np.array([job]) for job in range(numPatients)])
+    order = np.lexsort(columns[::-1])
+    sortedColumns = np.stack([column[order] for column in columns])
+    boundaries = np.flatnonzero((np.diff(sortedColumns, axis=1) != 0).any(axis=0)) + 1
+    members = np.split(order, boundaries)
+    heads = order[np.concatenate([[0], boundaries])]
+    return Presolved(programInput.subset(heads), np.array([len(jobs) for jobs in members], dtype=np.int64), members)
+
+def expandTimes(presolved, groupTimes):
+    """Returns the [T1, T2] times of every patient of the input, out of the times of the groups.
+
+    groupTimes holds for every group the list of the times of the first doses and the list of the times of the second doses of its
+    patients, in any order. Sorted, the i-th first dose goes with the i-th second dose: when any pairing of the times meets the gap
+    constraint of the group, this one does.
+    """
+    numPatients = int(presolved.multiplicity.sum())
+    times = [None] * numPatients
+    for jobs, (firstTimes, secondTimes) in zip(presolved.members, groupTimes):
+        for job, T1, T2 in zip(jobs.tolist(), sorted(firstTimes), sorted(secondTimes)):
+            times[job] = [T1, T2]
+    return times
+
+def timeScale(programInput):
+    """Returns (factor, offset): the largest factor such that p1, p2, gap, x, l and the release times and ends r - offset and
+    d + 1 - offset of all windows are multiples of it, with offset the earliest release time. (1, 0) when there is no such factor > 1.
+
+    Every dose of a schedule of such an input can be moved back to offset + a multiple of factor, without breaking its windows or the
+    gap constraint, and without starting earlier than a dose that ends before it. So an optimal schedule of the input divided by factor
+    is an optimal schedule of the input, times factor.
+    """
+    if len(programInput.r) == 0 or programInput.r.dtype == object:
+        return 1, 0
+    offset = int(programInput.r.min())
+    factor = math.gcd(programInput.p1, programInput.p2, programInput.gap)
+    for column in (programInput.r - offset, programInput.d + 1 - offset, programInput.x, programInput.l):
+        factor = math.gcd(factor, int(np.gcd.reduce(column)))
+    return (factor, offset) if factor > 1 else (1, 0)
+
+def scaleInput(programInput, factor, offset):
+    """Returns the input with all times moved by -offset and divided by factor, see timeScale."""
+    return ProgramInput(programInput.p1 // factor, programInput.p2 // factor, programInput.gap // factor, (programInput.r - offset) // factor,
+                        (programInput.d + 1 - offset) // factor - 1, programInput.x // factor, programInput.l // factor)
+
+def unscaleSchedule(schedule, factor, offset):
+    """Returns a copy of a schedule of scaleInput(programInput, factor, offset) with the times of programInput."""
+    if not schedule.hasSolution():
+        return schedule
+    return Schedule(schedule.T1 * factor + offset, schedule.M1, schedule.T2 * factor + offset, schedule.M2, schedule.machines, schedule.status,
+                    schedule.bound, schedule.bounds, schedule.phases, schedule.stats, schedule.profile)
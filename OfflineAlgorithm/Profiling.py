@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""Instrumentation of the offline algorithms of the Federal Vaccination Agency. Measures the wall-clock time, CPU time and peak memory of
+every phase of a run, and keeps the size of the model, the statistics of the search and the timeline of the solutions and bounds."""
+import json
+import os
+import re
+import resource
+import sys
+from time import perf_counter, process_time
+
+def peakMemory():
+    """Returns the peak resident memory of the process so far in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class Profiler:
+    """Measures the phases of a run, a phase lasts from the end of the previous phase to the call of lap
+
+    Attributes:
+        phases      Wall-clock seconds of every phase by name, the phases of the Schedule
+        cpu         CPU seconds of every phase by name, summed over all threads of the process such as the CP-SAT workers
+        memory      Peak resident memory of the process in MB at the end of every phase, by name
+        model       Size of the model, such as the number of variables and constraints
+        search      Statistics of the search reported by the solver
+        timeline    Dicts with the seconds since the start of the run and the machines of every improving schedule or the new bound
+        events      (name, start, seconds) of every phase, with start in seconds since the start of the run
+    """
+    def __init__(self):
+        self.phases = {}
+        self.cpu = {}
+        self.memory = {}
+        self.model = {}
+        self.search = {}
+        self.timeline = []
+        self.events = []
+        self.started = perf_counter()
+        self.lapWall = self.started
+        self.lapCpu = process_time()
+
+    def elapsed(self):
+        return perf_counter() - self.started
+
+    def lap(self, name):
+        """Ends the phase name and starts the next one."""
+        wall = perf_counter()
+        cpu = process_time()
+        self.phases[name] = wall - self.lapWall
+        self.cpu[name] = cpu - self.lapCpu
+        self.memory[name] = peakMemory()
+        self.events.append((name, self.lapWall - self.started, wall - self.lapWall))
+        self.lapWall = wall
+        self.lapCpu = cpu
+
+    def solution(self, machines, bound=None):
+        """Adds an improving schedule with machines hospitals to the timeline."""
+        self.timeline.append({"seconds": self.elapsed(), "machines": machines, "bound": bound})
+
+    def bound(self, bound):
+        """Adds an improved lower bound to the timeline."""
+        self.timeline.append({"seconds": self.elapsed(), "machines": None, "bound": bound})
+
+    def record(self):
+        """Returns the measurements as a dict that can be written as JSON."""
+        return {
+            "wall": self.elapsed(),
+            "cpu": sum(self.cpu.values()),
+            "peakMemory": peakMemory(),
+            "phases": {name: {"wall": self.phases[name], "cpu": self.cpu.get(name), "peakMemory": self.memory.get(name)} for name in self.phases},
+            "model": self.model,
+            "search": self.search,
+            "timeline": self.timeline,
+        }
+
+    def writeRecord(self, path):
+        with open(path, "w") as fd:
+            json.dump(self.record(), fd, indent=1)
+
+    def writeTrace(self, path):
+        """Writes the phases and the timeline in the trace event format, which chrome://tracing and Perfetto can show."""
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": seconds * 1e6, "pid": pid, "tid": 0,
+                   "args": {"cpu": self.cpu.get(name), "peakMemory": self.memory.get(name)}} for name, start, seconds in self.events]
+        for point in self.timeline:
+            name = "solution" if point["machines"] is not None else "bound"
+            events.append({"name": name, "ph": "i", "s": "p", "ts": point["seconds"] * 1e6, "pid": pid, "tid": 0, "args": point})
+        with open(path, "w") as fd:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fd)
+
+    def summary(self):
+        """Returns a table with a line per phase, followed by the totals."""
+        lines = [f"{'phase':<12}{'wall':>10}{'cpu':>10}{'peak MB':>10}"]
+        for name, seconds in self.phases.items():
+            lines.append(f"{name:<12}{seconds:>9.3f}s{self.cpu.get(name, 0):>9.3f}s{self.memory.get(name, 0):>10.1f}")
+        lines.append(f"{'total':<12}{self.elapsed():>9.3f}s{sum(self.cpu.values()):>9.3f}s{peakMemory():>10.1f}")
+        if self.model:
+            lines.append("model: " + ", ".join(f"{name} {value}" for name, value in self.model.items()))
+        if self.search:
+            lines.append("search: " + ", ".join(f"{name} {value}" for name, value in self.search.items()))
+        return "\n".join(lines)
+
+def logPresolve(solver, profiler):
+    """Lets CP-SAT log its progress to the profiler instead of stdout, to split the time of the solver into presolve and search."""
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+
+    def log(line):
+        match = re.match(r"Starting search at ([0-9.]+)s", line)
+        if match:
+            profiler.search["presolve"] = float(match.group(1))
+    solver.log_callback = log
+
+def cpsatStatistics(solver):
+    """Returns the statistics of the search of a CP-SAT solver after solving."""
+    response = solver.ResponseProto()
+    return {"conflicts": response.num_conflicts, "branches": response.num_branches, "booleans": response.num_booleans,
+            "restarts": response.num_restarts, "lpIterations": response.num_lp_iterations,
+            "deterministicTime": response.deterministic_time, "userTime": response.user_time, "gapIntegral": response.gap_integral}
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""Rolling-horizon solver of the Federal Vaccination Agency, for inputs that are too big to model at once. The patients are solved in
+windows of bounded size in order of release time, every window with the CP-SAT model, around the doses committed by earlier windows."""
+from ortools.sat.python import cp_model
+from OfflineCPSAT import addNoOverlap2DModel
+from Decomposition import solveDecomposed
+from Bounds import computeLowerBound
+from Heuristic import Hospital, greedySchedule
+from SolverOptions import SolverOptions
+from Schedule import Schedule, OPTIMAL, FEASIBLE
+from Instance import parseInput
+import argparse
+import heapq
+import sys
+import numpy as np
+from time import perf_counter
+
+# Only the model with the hospitals can place doses around committed doses on fixed hospitals
+FORMULATIONS = ["nooverlap2d"]
+
+class ReorderBuffer:
+    """Writes schedule lines in input order, while the patients are committed in order of release time.
+
+    The lines are read from the T1, M1, T2 and M2 arrays of the schedule, the buffer only keeps which patients are committed. A line
+    is written as soon as all patients before it are committed.
+    """
+    def __init__(self, out, T1, M1, T2, M2):
+        self.out = out
+        self.columns = (T1, M1, T2, M2)
+        self.committed = np.zeros(len(T1), dtype=bool)
+        self.next = 0
+
+    def commit(self, jobs):
+        self.committed[jobs] = True
+        start = self.next
+        while self.next < len(self.committed) and self.committed[self.next]:
+            self.next += 1
+        # Write in chunks, the lines of an input that is not ordered by release time only become ready at the very end
+        for chunk in range(start, self.next, 65536):
+            T1, M1, T2, M2 = (column[chunk:min(chunk + 65536, self.next)].tolist() for column in self.columns)
+            self.out.write("".join(f"{t1}, {m1}, {t2}, {m2}\n" for t1, m1, t2, m2 in zip(T1, M1, T2, M2)))
+        if self.next > start:
+            self.out.flush()
+
+def solveWindow(programInput, fixedDoses, machines, timeLimit, options):
+    """Schedules the patients of a window around the fixed (start, end, machine) doses, using at least machines hospitals.
+
+    Returns the [T1, M1, T2, M2] lines of the patients and the number of hospitals used by the window and the fixed doses.
+    """
+    # The heuristic books around the fixed doses, its schedule is the upper bound and the hint of the model
+    hospitals = [Hospital() for machine in range(machines)]
+    for start, end, machine in sorted(fixedDoses):
+        hospitals[machine - 1].book(start, end)
+    heuristic, heuristicMachines = greedySchedule(programInput, hospitals)
+    if heuristicMachines <= machines or timeLimit <= 0:
+        # The window does not need more hospitals than the earlier windows, which is as good as it gets
+        return heuristic, heuristicMachines
+
+    model = cp_model.CpModel()
+    solver = cp_model.CpSolver()
+    # windowMachines is the highest hospital used by the patients of the window, the objective counts the hospitals of all windows
+    windowMachines = model.NewIntVar(1, heuristicMachines, "windowMachines")
+    highestMachineNumber = model.NewIntVar(machines, heuristicMachines, "M")
+    model.Add(highestMachineNumber >= windowMachines)
+    patientVariables = addNoOverlap2DModel(model, programInput, windowMachines, heuristicMachines, fixedDoses)
+    for patient, scheduleLine in zip(patientVariables, heuristic):
+        patient.addHint(model, programInput, scheduleLine, True)
+    model.Minimize(highestMachineNumber)
+
+    solver.parameters.max_time_in_seconds = timeLimit
+    options.apply(solver)
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return heuristic, heuristicMachines
+    return [patient.solutionLine(solver) for patient in patientVariables], solver.Value(highestMachineNumber)
+
+def solveRolling(programInput, windowSize=200, overlap=50, timeLimit=1800, windowTimeLimit=10, options=None, out=None):
+    """Solves the input in windows of windowSize patients in order of release time, and returns the Schedule.
+
+    Consecutive windows share overlap patients: only the first windowSize - overlap patients of a window are committed, the others are
+    solved again in the next window. The committed doses are fixed intervals for the later windows, and are dropped as soon as no later
+    patient can be scheduled before their end. Every window gets at most windowTimeLimit seconds, and the windows together at most
+    timeLimit seconds. With out, the schedule lines are written to out in input order as soon as they are committed.
+    """
+    options = SolverOptions() if options is None else options
+    numPatients = len(programInput.patients)
+    p1 = programInput.p1
+    p2 = programInput.p2
+    commitSize = max(1, windowSize - overlap)
+    deadline = perf_counter() + timeLimit
+    phases = {"windows": 0.0}
+
+    start = perf_counter()
+    order = np.argsort(programInput.r, kind="stable")
+    lowerBound = computeLowerBound(programInput)
+    phases["bounds"] = perf_counter() - start
+    start = perf_counter()
+
+    T1 = np.zeros(numPatients, dtype=np.int64)
+    M1 = np.zeros(numPatients, dtype=np.int64)
+    T2 = np.zeros(numPatients, dtype=np.int64)
+    M2 = np.zeros(numPatients, dtype=np.int64)
+    buffer = None if out is None else ReorderBuffer(out, T1, M1, T2, M2)
+    # Committed doses that may still be running when a later patient is scheduled, as (end, start, machine) ordered by end
+    committed = []
+    machines = 0
+    position = 0
+    while position < numPatients:
+        window = order[position:position + windowSize]
+        commit = len(window) if position + windowSize >= numPatients else commitSize
+        windowInput = programInput.subset(window)
+
+        # The windows start in order of release time, doses that end before this window starts can never be in the way again
+        windowStart = windowInput.mintime[0]
+        windowEnd = windowInput.maxtime[1] + p2
+        while committed and committed[0][0] <= windowStart:
+            heapq.heappop(committed)
+        fixedDoses = [(doseStart, doseEnd, machine) for doseEnd, doseStart, machine in committed if doseStart < windowEnd]
+
+        # Share the remaining time over the remaining windows
+        remainingWindows = -(-(numPatients - position) // commitSize)
+        limit = min(windowTimeLimit, (deadline - perf_counter()) / remainingWindows)
+        lines, machines = solveWindow(windowInput, fixedDoses, machines, limit, options)
+
+        jobs = window[:commit].tolist()
+        for job, (t1, m1, t2, m2) in zip(jobs, lines):
+            T1[job], M1[job], T2[job], M2[job] = t1, m1, t2, m2
+            heapq.heappush(committed, (t1 + p1, t1, m1))
+            heapq.heappush(committed, (t2 + p2, t2, m2))
+        if buffer is not None:
+            buffer.commit(jobs)
+        position += commit
+
+    phases["windows"] = perf_counter() - start
+    if buffer is not None:
+        out.write(f"{machines}\n")
+    status = OPTIMAL if machines <= lowerBound else FEASIBLE
+    return Schedule(T1, M1, T2, M2, machines, status, lowerBound, phases=phases)
+
+def SolveILP(programInput, formulation="nooverlap2d", decompose=False, timeLimit=1800, onSolution=None, options=None):
+    """Solves the input with the default windows, with the same arguments as SolveILP of OfflineCPSAT, so that it can be benchmarked
+    and decomposed like the other solvers."""
+    if decompose:
+        schedule = solveDecomposed(programInput, "RollingHorizon", formulation, timeLimit, options=options)
+    else:
+        schedule = solveRolling(programInput, timeLimit=timeLimit, options=options)
+    if onSolution is not None and schedule.hasSolution():
+        onSolution(schedule)
+    return schedule
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--window", type=int, default=200, help="number of patients in a window")
+    parser.add_argument("--overlap", type=int, default=50, help="number of patients that a window shares with the next window")
+    parser.add_argument("--window-time-limit", type=float, default=10, help="time limit of the solver per window in seconds")
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit of all windows together in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="number of search workers, all cores by default")
+    args = parser.parse_args()
+
+    schedule = solveRolling(parseInput(), args.window, args.overlap, args.time_limit, args.window_time_limit, SolverOptions(args.workers),
+                            sys.stdout)
+    print(schedule.summary(), file=sys.stderr)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""Schedule found by the offline algorithms of the Federal Vaccination Agency."""
+import os
+import sys
+import numpy as np
+from time import perf_counter
+
+# Status of a schedule returned by a solver
+OPTIMAL = "optimal" # The schedule uses the minimal number of hospitals
+FEASIBLE = "feasible" # The schedule is feasible, but the solver did not prove that it is optimal
+INFEASIBLE = "infeasible" # The solver proved that there is no feasible schedule
+TIMEOUT = "timeout" # The solver did not find a schedule within its time limit
+
+class Schedule:
+    """A schedule for all patients of a ProgramInput
+
+    Attributes:
+        T1, M1        Per patient: arrays with the timeslot resp. hospital of the first dose, None when there is no schedule
+        T2, M2        Per patient: arrays with the timeslot resp. hospital of the second dose, None when there is no schedule
+        machines      Number of hospitals used by the schedule, None when there is no schedule
+        status        OPTIMAL, FEASIBLE, INFEASIBLE or TIMEOUT
+        bound         Lower bound on the number of hospitals that was proven by the solver
+        bounds        (lowerBound, upperBound) on the number of hospitals that was computed before solving
+        phases        Wall-clock time in seconds of every phase of the solver, by name of the phase
+        stats         Numbers that describe the model of the solver, by name
+        profile       Profiler that measured the run of the solver, None when the run was not measured
+    """
+    def __init__(self, T1, M1, T2, M2, machines, status=OPTIMAL, bound=None, bounds=None, phases=None, stats=None, profile=None):
+        self.T1 = None if T1 is None else np.asarray(T1, dtype=np.int64)
+        self.M1 = None if M1 is None else np.asarray(M1, dtype=np.int64)
+        self.T2 = None if T2 is None else np.asarray(T2, dtype=np.int64)
+        self.M2 = None if M2 is None else np.asarray(M2, dtype=np.int64)
+        self.machines = machines
+        self.status = status
+        self.bound = machines if bound is None and status == OPTIMAL else bound
+        self.bounds = bounds
+        self.phases = {} if phases is None else phases
+        self.stats = {} if stats is None else stats
+        self.profile = profile
+
+    @staticmethod
+    def fromLines(lines, machines, **kwargs):
+        """Creates a schedule out of [T1, M1, T2, M2] lines, one per patient."""
+        return Schedule([line[0] for line in lines], [line[1] for line in lines], [line[2] for line in lines], [line[3] for line in lines],
+                        machines, **kwargs)
+
+    @staticmethod
+    def noSolution(status, **kwargs):
+        """Creates the result of a solver that did not find a schedule."""
+        return Schedule(None, None, None, None, None, status, **kwargs)
+
+    @staticmethod
+    def parseOutput(text):
+        """Turns the printed output of a solver back into a schedule, returns None when the output holds no schedule."""
+        try:
+            values = np.fromstring(text.replace(",", " "), dtype=np.int64, sep=" ")
+        except ValueError:
+            return None
+        if len(values) % 4 != 1:
+            return None
+        # Every patient has 4 values on its line, the last value is the number of hospitals
+        lines = values[:-1].reshape(-1, 4)
+        return Schedule(lines[:, 0], lines[:, 1], lines[:, 2], lines[:, 3], int(values[-1]))
+
+    def hasSolution(self):
+        return self.T1 is not None
+
+    def lines(self):
+        """Returns the [T1, M1, T2, M2] line of every patient."""
+        return [list(line) for line in zip(self.T1.tolist(), self.M1.tolist(), self.T2.tolist(), self.M2.tolist())]
+
+    def gap(self):
+        """Returns the optimality gap (machines - bound) / machines of the schedule, None when there is no schedule or bound."""
+        if self.machines is None or self.bound is None:
+            return None
+        return (self.machines - self.bound) / self.machines if self.machines > 0 else 0.0
+
+    def summary(self):
+        """Returns a single line that describes the result of the solver."""
+        text = f"Status: {self.status}, machines: {self.machines}, bound: {self.bound}"
+        if self.status == FEASIBLE and self.gap() is not None:
+            text += f", gap: {self.gap():.1%}"
+        if self.bounds is not None:
+            text += f", bounds before solving: [{self.bounds[0]}, {self.bounds[1]}]"
+        if self.phases:
+            text += ", phases: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        if self.stats:
+            text += ", " + ", ".join(f"{name}: {value}" for name, value in self.stats.items())
+        return text
+
+def writeSchedule(schedule, out=None):
+    """Writes the schedule in the output format: one line per patient, followed by the number of hospitals.
+
+    The whole output is built first and written at once, instead of printing every line on its own.
+    """
+    out = sys.stdout if out is None else out
+    if not schedule.hasSolution():
+        out.write("Could not find a solution\n")
+        return
+    lines = [f"{T1}, {M1}, {T2}, {M2}\n" for T1, M1, T2, M2 in zip(schedule.T1.tolist(), schedule.M1.tolist(), schedule.T2.tolist(), schedule.M2.tolist())]
+    lines.append(f"{schedule.machines}\n")
+    out.write("".join(lines))
+
+def anytimeReporter(incumbentPath=None, out=None):
+    """Returns an onSolution callback for the solvers, that writes a line for every improving schedule to out (stderr by default).
+
+    With incumbentPath, every improving schedule is also written to that file. The file is replaced at once, so it always holds the
+    best complete schedule found so far.
+    """
+    out = sys.stderr if out is None else out
+    start = perf_counter()
+
+    def report(schedule):
+        gap = schedule.gap()
+        out.write(f"Schedule after {perf_counter() - start:.3f}s: machines: {schedule.machines}, bound: {schedule.bound}"
+                  + ("" if gap is None else f", gap: {gap:.1%}") + "\n")
+        out.flush()
+        if incumbentPath is not None:
+            with open(incumbentPath + ".tmp", "w") as fd:
+                writeSchedule(schedule, fd)
+            os.replace(incumbentPath + ".tmp", incumbentPath)
+    return report
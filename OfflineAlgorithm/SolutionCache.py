@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""Disk cache of the schedules found by the offline algorithms of the Federal Vaccination Agency. Inputs that only differ in the order of
+the patients or by a shift of all times share their entry, so an input is never solved twice."""
+import hashlib
+import json
+import os
+import numpy as np
+from time import perf_counter, time
+from Schedule import Schedule, OPTIMAL, FEASIBLE, INFEASIBLE
+
+def canonicalize(programInput):
+    """Returns (key, order, offset) of the input.
+
+    The canonical input has all times shifted by offset, so that the earliest release time is 0, and the patients sorted by (r, d, x, l).
+    Patient i of the canonical input is patient order[i] of the input. key is a hash of the canonical input.
+    """
+    numPatients = len(programInput.patients)
+    offset = 0 if numPatients == 0 else int(programInput.r.min())
+    r = programInput.r - offset
+    d = programInput.d - offset
+    x = programInput.x
+    l = programInput.l
+    digest = hashlib.sha256(f"{programInput.p1},{programInput.p2},{programInput.gap},{numPatients}".encode())
+    if any(column.dtype == object for column in (r, d, x, l)):
+        # Numbers that do not fit in 64 bits are Python integers, which numpy can not sort on several keys or turn into bytes
+        order = np.array(sorted(range(numPatients), key=lambda job: (r[job], d[job], x[job], l[job])), dtype=np.int64)
+        for column in (r, d, x, l):
+            digest.update(",".join(str(value) for value in column[order]).encode())
+    else:
+        order = np.lexsort((l, x, d, r))
+        for column in (r, d, x, l):
+            digest.update(np.ascontiguousarray(column[order], dtype=np.int64).tobytes())
+    return digest.hexdigest(), order, offset
+
+class SolutionCache:
+    """Schedules on disk by canonical input, every entry is a .npz file in directory
+
+    The entries are evicted least recently used first, as soon as all entries together are bigger than maxBytes. Every entry records
+    the solver that found the schedule and its status, only OPTIMAL and INFEASIBLE entries are final.
+    """
+    def __init__(self, directory, maxBytes=1 << 30):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key):
+        """Returns the arrays and the metadata of the entry with key, or None when there is no such entry."""
+        try:
+            with np.load(self.path(key)) as entry:
+                return {name: entry[name] for name in ("T1", "M1", "T2", "M2")}, json.loads(str(entry["meta"]))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, programInput, acceptFeasible=False):
+        """Returns the cached Schedule of the input in its own patient order and times, or None.
+
+        Entries with a FEASIBLE schedule are only returned with acceptFeasible, a longer run of the solver may still improve on them.
+        """
+        start = perf_counter()
+        key, order, offset = canonicalize(programInput)
+        loaded = self.load(key)
+        if loaded is None:
+            return None
+        arrays, meta = loaded
+        if meta["status"] == FEASIBLE and not acceptFeasible:
+            return None
+        # Mark the entry as recently used
+        os.utime(self.path(key))
+
+        phases = {"cache": perf_counter() - start}
+        if meta["status"] == INFEASIBLE:
+            return Schedule.noSolution(INFEASIBLE, phases=phases)
+        numPatients = len(order)
+        T1 = np.zeros(numPatients, dtype=np.int64)
+        M1 = np.zeros(numPatients, dtype=np.int64)
+        T2 = np.zeros(numPatients, dtype=np.int64)
+        M2 = np.zeros(numPatients, dtype=np.int64)
+        T1[order] = arrays["T1"] + offset
+        M1[order] = arrays["M1"]
+        T2[order] = arrays["T2"] + offset
+        M2[order] = arrays["M2"]
+        return Schedule(T1, M1, T2, M2, meta["machines"], meta["status"], meta["bound"], phases=phases)
+
+    def put(self, programInput, schedule, solver):
+        """Stores the schedule that solver found for the input, unless the cache already holds an entry that is at least as good."""
+        if not schedule.hasSolution() and schedule.status != INFEASIBLE:
+            return
+        key, order, offset = canonicalize(programInput)
+        existing = self.load(key)
+        if existing is not None and not isBetter(schedule, existing[1]):
+            return
+
+        meta = {"solver": solver, "status": schedule.status, "machines": schedule.machines, "bound": schedule.bound,
+                "seconds": sum(schedule.phases.values()), "created": time()}
+        if schedule.hasSolution():
+            arrays = {"T1": schedule.T1[order] - offset, "M1": schedule.M1[order], "T2": schedule.T2[order] - offset, "M2": schedule.M2[order]}
+        else:
+            arrays = {name: np.zeros(0, dtype=np.int64) for name in ("T1", "M1", "T2", "M2")}
+        # Write to a temporary file first, so that a reader never sees half an entry
+        temporary = self.path(key) + f".{os.getpid()}.tmp"
+        with open(temporary, "wb") as fd:
+            np.savez(fd, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in maxBytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                status = os.stat(os.path.join(self.directory, name))
+                entries.append((status.st_mtime, status.st_size, name))
+        entries.sort()
+        total = sum(size for modified, size, name in entries)
+        for modified, size, name in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def isBetter(schedule, meta):
+    """Returns whether the schedule is better than the cached entry with metadata meta."""
+    if meta["status"] in (OPTIMAL, INFEASIBLE):
+        return False
+    if schedule.status in (OPTIMAL, INFEASIBLE):
+        return True
+    return schedule.machines < meta["machines"]
+
+def solveCached(cache, programInput, solver, solve, acceptFeasible=False):
+    """Returns the cached schedule of the input, or solves it with solve(programInput) and stores the result under the name solver."""
+    if cache is None:
+        return solve(programInput)
+    schedule = cache.get(programInput, acceptFeasible)
+    if schedule is None:
+        schedule = solve(programInput)
+        cache.put(programInput, schedule, solver)
+    return schedule
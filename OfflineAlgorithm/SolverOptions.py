@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""Configuration of the CP-SAT solver of the Federal Vaccination Agency: the number of workers, the search strategy, presolve, LNS and
+symmetry breaking."""
+import json
+import math
+import os
+from ortools.sat.python import cp_model
+
+# Search strategies, by the variables that are branched on first: none (CP-SAT decides), the start times of the doses, the machine
+# numbers of the doses, or the start times followed by the machine numbers
+STRATEGIES = ["automatic", "time", "machine", "time-machine"]
+
+class SolverOptions:
+    """Parameters of a CP-SAT run
+
+    Attributes:
+        workers       Number of search workers that run in parallel, all cores by default
+        strategy      One of STRATEGIES, the decision strategy that is added to the model
+        fixedSearch   Whether the workers follow the decision strategy exactly, instead of using it as a hint
+        presolve      Whether CP-SAT presolves the model
+        probingLevel  Effort of the probing during presolve, 0 (none) to 3 (most)
+        lns           Whether the workers that do large neighbourhood search are used
+        seed          Random seed of the solver
+        symmetry      Whether the symmetry breaking constraints of Symmetry.py are added to the model
+        parameters    Any other CP-SAT parameters, by name
+    """
+    def __init__(self, workers=None, strategy="automatic", fixedSearch=False, presolve=True, probingLevel=2, lns=True, seed=0, symmetry=False,
+                 parameters=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.strategy = strategy
+        self.fixedSearch = fixedSearch
+        self.presolve = presolve
+        self.probingLevel = probingLevel
+        self.lns = lns
+        self.seed = seed
+        self.symmetry = symmetry
+        self.parameters = {} if parameters is None else dict(parameters)
+
+    def apply(self, solver):
+        """Sets the options on the parameters of a CpSolver."""
+        parameters = solver.parameters
+        parameters.num_workers = self.workers
+        parameters.cp_model_presolve = self.presolve
+        parameters.cp_model_probing_level = self.probingLevel
+        parameters.use_lns = self.lns
+        parameters.random_seed = self.seed
+        if self.fixedSearch and self.strategy != "automatic":
+            parameters.search_branching = cp_model.FIXED_SEARCH
+        for name, value in self.parameters.items():
+            setattr(parameters, name, value)
+
+    def addDecisionStrategy(self, model, timeVariables, machineVariables):
+        """Adds the decision strategy to the model: the doses with the earliest possible start are scheduled first, at their earliest time
+        resp. on their lowest machine. machineVariables is empty when the hospitals are not part of the model."""
+        if self.strategy in ("time", "time-machine"):
+            model.AddDecisionStrategy(timeVariables, cp_model.CHOOSE_LOWEST_MIN, cp_model.SELECT_MIN_VALUE)
+        if self.strategy in ("machine", "time-machine") and machineVariables:
+            model.AddDecisionStrategy(machineVariables, cp_model.CHOOSE_FIRST, cp_model.SELECT_MIN_VALUE)
+
+    def forComponents(self, numComponents):
+        """Returns the options for the solves of numComponents independent parts in parallel, which share the workers."""
+        options = SolverOptions(**self.toDict())
+        options.workers = max(1, self.workers // max(1, numComponents))
+        return options
+
+    def toDict(self):
+        return {"workers": self.workers, "strategy": self.strategy, "fixedSearch": self.fixedSearch, "presolve": self.presolve,
+                "probingLevel": self.probingLevel, "lns": self.lns, "seed": self.seed, "symmetry": self.symmetry, "parameters": self.parameters}
+
+    @staticmethod
+    def fromDict(values):
+        return SolverOptions(**values)
+
+    def __str__(self):
+        return ", ".join(f"{name}={value}" for name, value in self.toDict().items() if name != "parameters" or value)
+
+def sizeClass(numPatients):
+    """Returns the size class of an instance with numPatients patients: the power of 10 at or below it."""
+    return 0 if numPatients < 1 else 10 ** int(math.log10(numPatients))
+
+def loadTuned(path, numPatients):
+    """Returns the (formulation, SolverOptions) that was the fastest for the size class of numPatients in the tuning file at path.
+
+    When the size class was not tuned, the configuration of the closest tuned size class is used.
+    """
+    with open(path, "r") as fd:
+        tuning = json.load(fd)
+    tuned = tuning["sizes"]
+    size = sizeClass(numPatients)
+    closest = min(tuned, key=lambda key: abs(math.log10(max(int(key), 1)) - math.log10(max(size, 1))))
+    config = tuned[closest]
+    options = SolverOptions.fromDict(config["options"])
+    # The tuning machine may have had another number of cores, using all of them there means using all of them here
+    if options.workers >= tuning["cores"]:
+        options.workers = os.cpu_count() or 1
+    return config["formulation"], options
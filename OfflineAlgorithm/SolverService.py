@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""Solver service of the Federal Vaccination Agency, for pushing many inputs through the solvers without starting Python and importing
+OR-Tools for every input. A pool of worker processes stays alive and solves the requests it is sent, as JSON lines over stdin or a Unix
+socket, and answers every request with a JSON line with its result.
+
+A request is a JSON object, a batch is a JSON array of requests. The input of a request is either "instance", the text of an input
+file, or "path", the path of one. The other fields are optional: "id" is copied to the response, "solver" is one of the solvers of
+PerformCompare.py (cpsat by default), "timeLimit" is in seconds, "workers" is the number of CP-SAT workers, "options" holds
+SolverOptions values by name, and "schedule": false leaves the schedule out of the response."""
+from PerformCompare import SOLVERS, solverArguments
+from Instance import parseText, loadInstance
+import argparse
+import json
+import multiprocessing as mp
+import os
+import signal
+import socketserver
+import sys
+import threading
+from time import perf_counter
+
+def solveRequest(task):
+    """Solves a single request in a worker process, returns the response. task is (request, timeLimit, workers) with the defaults of
+    the service."""
+    request, timeLimit, workers = task
+    response = {"id": request.get("id")}
+    start = perf_counter()
+    try:
+        solverName = request.get("solver", "cpsat")
+        if solverName not in SOLVERS:
+            raise ValueError(f"unknown solver {solverName}, use one of {', '.join(SOLVERS)}")
+        module, formulation = SOLVERS[solverName]
+        # The worker parses the input itself, so only the text or path of the input is sent to it
+        programInput = parseText(request["instance"]) if "instance" in request else loadInstance(request["path"])
+        arguments = solverArguments(solverName, request.get("workers", workers), request.get("options"))
+        schedule = module.SolveILP(programInput, formulation, timeLimit=request.get("timeLimit", timeLimit), **arguments)
+    except Exception as error:
+        response["error"] = f"{type(error).__name__}: {error}"
+        return response
+
+    response.update({"solver": solverName, "status": schedule.status, "machines": schedule.machines, "bound": schedule.bound,
+                     "time": perf_counter() - start, "phases": dict(schedule.phases)})
+    if request.get("schedule", True) and schedule.hasSolution():
+        response["schedule"] = {"T1": schedule.T1.tolist(), "M1": schedule.M1.tolist(), "T2": schedule.T2.tolist(),
+                                "M2": schedule.M2.tolist()}
+    return response
+
+class SolverService:
+    """Pool of worker processes that solve requests and write the responses as JSON lines, in the order in which they finish
+
+    Attributes:
+        processes   Number of requests that are solved at the same time
+        timeLimit   Time limit in seconds of the requests that do not set their own
+        workers     Number of CP-SAT workers of the requests that do not set their own, the cores are shared by the processes by default
+    """
+    def __init__(self, processes=None, timeLimit=1800, workers=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.timeLimit = timeLimit
+        self.workers = workers or max(1, (os.cpu_count() or 1) // self.processes)
+        self.pool = mp.Pool(self.processes)
+
+    def submit(self, line, write):
+        """Submits the requests of a JSON line, write(text) is called with the line of every response. Returns the AsyncResults."""
+        try:
+            requests = json.loads(line)
+        except ValueError as error:
+            write(json.dumps({"id": None, "error": f"invalid JSON: {error}"}) + "\n")
+            return []
+        requests = requests if isinstance(requests, list) else [requests]
+        results = []
+        for request in requests:
+            if not isinstance(request, dict) or ("instance" not in request and "path" not in request):
+                write(json.dumps({"id": request.get("id") if isinstance(request, dict) else None,
+                                  "error": "a request needs an instance or a path"}) + "\n")
+                continue
+            results.append(self.pool.apply_async(solveRequest, ((request, self.timeLimit, self.workers),),
+                                                 callback=lambda response: write(json.dumps(response) + "\n"),
+                                                 error_callback=lambda error, id=request.get("id"): write(json.dumps(
+                                                     {"id": id, "error": f"{type(error).__name__}: {error}"}) + "\n")))
+        return results
+
+    def serveStream(self, lines, out):
+        """Solves the requests of the JSON lines in lines, and writes the responses to out. Returns when all requests are answered."""
+        lock = threading.Lock()
+
+        def write(text):
+            with lock:
+                out.write(text)
+                out.flush()
+        results = []
+        for line in lines:
+            if line.strip():
+                results.extend(self.submit(line, write))
+        for result in results:
+            result.wait()
+
+    def serveSocket(self, path):
+        """Accepts connections on the Unix socket at path until interrupted, every connection is served like a stream."""
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                service.serveStream((line.decode() for line in self.rfile), WriteFile(self.wfile))
+
+        if os.path.exists(path):
+            os.unlink(path)
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            try:
+                server.serve_forever()
+            finally:
+                os.unlink(path)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+class WriteFile:
+    """Text writes on a binary file of a socket connection"""
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, text):
+        self.file.write(text.encode())
+
+    def flush(self):
+        self.file.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", help="path of the Unix socket to accept requests on, stdin and stdout are used without it")
+    parser.add_argument("--processes", type=int, default=None, help="number of requests solved at the same time, one per core by default")
+    parser.add_argument("--time-limit", type=float, default=1800, help="time limit in seconds of the requests without a timeLimit")
+    parser.add_argument("--workers", type=int, default=None, help="number of CP-SAT workers of the requests without workers")
+    args = parser.parse_args()
+
+    service = SolverService(args.processes, args.time_limit, args.workers)
+    # Stop like on an interrupt when terminated, so that the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.socket:
+            service.serveSocket(args.socket)
+        else:
+            service.serveStream(sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
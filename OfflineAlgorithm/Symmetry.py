@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""Symmetry breaking for the CP-SAT model of the Federal Vaccination Agency. Patients with the same (r, d, x, l) can swap their doses
+without changing the number of hospitals. The constraints below keep one order of the patients of every such class, so that the solver
+does not have to rule out all orders to prove optimality. They are only added within the classes, a single linear constraint per pair
+of consecutive patients, so the model grows with the number of patients that share a class and not with the size of the input."""
+import numpy as np
+
+def symmetricClasses(programInput, fixed=None):
+    """Returns the classes of interchangeable patients: arrays with the indices of the patients that have the same (r, d, x, l), for every
+    (r, d, x, l) that is shared by at least two patients. The patients in fixed, the result of fixedPatients, are left out, their dose
+    times are constants already."""
+    jobs = np.arange(len(programInput.r)) if fixed is None else np.flatnonzero(~fixed)
+    if len(jobs) < 2:
+        return []
+    columns = np.stack([programInput.r[jobs], programInput.d[jobs], programInput.x[jobs], programInput.l[jobs]], axis=1)
+    values, inverse = np.unique(columns, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # Group the patients by their row of values, the stable sort keeps every class in input order
+    order = np.argsort(inverse, kind="stable")
+    boundaries = np.flatnonzero(np.diff(inverse[order])) + 1
+    return [jobs[group] for group in np.split(order, boundaries) if len(group) > 1]
+
+def addSymmetryBreaking(model, programInput, patientVariables, classes, highestHospital=None):
+    """Adds the symmetry breaking constraints to the model.
+
+    Within every class of interchangeable patients the patients take their doses in input order: with the hospitals in the model,
+    highestHospital is the highest hospital number and (T1, M1) increases from one patient to the next. Two first doses at the same time
+    are on different hospitals, so the order is strict. Without hospitals (T1, T2) does not decrease. Both orders are a single linear
+    constraint on T1 * base + M1 resp. T1 * base + T2, with base larger than the range of the second value.
+    """
+    for jobs in classes:
+        job = int(jobs[0])
+        if highestHospital is not None:
+            base = highestHospital + 1
+        else:
+            base = int(programInput.lastPossible[1][job] - programInput.firstPossible[1][job]) + 1
+        for job, nextJob in zip(jobs.tolist(), jobs[1:].tolist()):
+            patient = patientVariables[job]
+            nextPatient = patientVariables[nextJob]
+            if highestHospital is not None:
+                model.Add(patient.starttimeDose1 * base + patient.machineDose1 < nextPatient.starttimeDose1 * base + nextPatient.machineDose1)
+            else:
+                model.Add(patient.starttimeDose1 * base + patient.starttimeDose2 <= nextPatient.starttimeDose1 * base + nextPatient.starttimeDose2)
+
+def symmetricLines(lines, classes, hospitals=True):
+    """Returns the [T1, M1, T2, M2] lines of a feasible schedule changed so that they meet the symmetry breaking constraints, for hinting.
+
+    The lines of every class are sorted by (T1, M1), or by (T1, T2) when the hospitals are not part of the model. This does not change
+    the number of hospitals.
+    """
+    lines = [list(line) for line in lines]
+    column = 1 if hospitals else 2
+    for jobs in classes:
+        jobs = jobs.tolist()
+        for job, line in zip(jobs, sorted((lines[job] for job in jobs), key=lambda line: (line[0], line[column]))):
+            lines[job] = line
+    return lines
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""Tuning harness for OfflineCPSAT.py, the program by the Federal Vaccination Agency to schedule vaccinations. Runs every configuration of
+the solver on the test instances, and records the fastest configuration per instance size."""
+import OfflineCPSAT as offline
+from SolverOptions import SolverOptions, STRATEGIES, sizeClass
+from PerformCompare import sorted_alphanumeric
+from Instance import loadInstance
+from Schedule import OPTIMAL
+import argparse
+import itertools
+import json
+import os
+from time import perf_counter
+
+def candidateConfigs(fullGrid=False):
+    """Returns the (formulation, SolverOptions) pairs to try.
+
+    By default every setting is changed on its own, starting from the default configuration. With fullGrid, all combinations are tried.
+    """
+    cores = os.cpu_count() or 1
+    settings = {
+        "formulation": offline.FORMULATIONS,
+        "workers": sorted({cores, max(1, cores // 2), 1}, reverse=True),
+        "strategy": STRATEGIES,
+        "fixedSearch": [False, True],
+        "presolve": [True, False],
+        "lns": [True, False],
+        "symmetry": [False, True],
+    }
+    default = {name: values[0] for name, values in settings.items()}
+    if fullGrid:
+        combinations = [dict(zip(settings, values)) for values in itertools.product(*settings.values())]
+    else:
+        combinations = [default] + [{**default, name: value} for name, values in settings.items() for value in values[1:]]
+
+    configs = []
+    for combination in combinations:
+        # Following the automatic strategy exactly is the same as the default search
+        if combination["fixedSearch"] and combination["strategy"] == "automatic":
+            continue
+        formulation = combination.pop("formulation")
+        configs.append((formulation, SolverOptions(**combination)))
+    return configs
+
+def score(time, status, timeLimit):
+    """Runs that are not solved to optimality count as twice the time limit, so that a configuration that fails is never the fastest."""
+    return time if status == OPTIMAL else 2 * timeLimit
+
+def tune(instanceDir, files, configs, timeLimit, maxPatients=None):
+    """Runs every configuration on every file with at most maxPatients patients, returns one record per run."""
+    records = []
+    for file in files:
+        programInput = loadInstance(os.path.join(instanceDir, file))
+        if maxPatients is not None and len(programInput.patients) > maxPatients:
+            continue
+        for index, (formulation, options) in enumerate(configs):
+            start = perf_counter()
+            schedule = offline.SolveILP(programInput, formulation, timeLimit=timeLimit, options=options)
+            time = perf_counter() - start
+            records.append({"file": file, "patients": len(programInput.patients), "config": index, "status": schedule.status,
+                            "machines": schedule.machines, "time": time, "score": score(time, schedule.status, timeLimit)})
+            print(f"{file} config {index} ({formulation}, {options}): {schedule.status}, {schedule.machines} machines, {time:.3f}s")
+    return records
+
+def fastestPerSize(records, configs):
+    """Returns, per size class, the configuration with the lowest total score over the instances of that size."""
+    sizes = {}
+    for size in sorted({sizeClass(record["patients"]) for record in records}):
+        totals = [0.0] * len(configs)
+        files = set()
+        for record in records:
+            if sizeClass(record["patients"]) == size:
+                totals[record["config"]] += record["score"]
+                files.add(record["file"])
+        best = min(range(len(configs)), key=lambda index: totals[index])
+        formulation, options = configs[best]
+        sizes[str(size)] = {"formulation": formulation, "options": options.toDict(), "score": totals[best], "files": sorted_alphanumeric(files)}
+    return sizes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--instances", default="../TestInstances/Offline", help="directory with the instances to tune on")
+    parser.add_argument("--time-limit", type=float, default=60, help="time limit per run in seconds")
+    parser.add_argument("--max-patients", type=int, default=10000, help="leave out instances with more patients")
+    parser.add_argument("--full-grid", action="store_true", help="try all combinations of the settings, instead of one setting at a time")
+    parser.add_argument("--output", default="tunedCPSAT.json", help="json file to write the fastest configurations to")
+    args = parser.parse_args()
+
+    files = sorted_alphanumeric(os.listdir(args.instances))
+    configs = candidateConfigs(args.full_grid)
+    records = tune(args.instances, files, configs, args.time_limit, args.max_patients)
+
+    with open(args.output, "w") as fd:
+        json.dump({"cores": os.cpu_count() or 1, "timeLimit": args.time_limit, "sizes": fastestPerSize(records, configs),
+                   "configs": [{"formulation": formulation, "options": options.toDict()} for formulation, options in configs],
+                   "runs": records}, fd, indent=1)